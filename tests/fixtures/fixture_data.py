@@ -1,10 +1,23 @@
 import tempfile
 
 import pytest
+from django.core.cache import cache
 from mixer.backend.django import mixer as _mixer
 from posts.models import Post, Group
 
 
+@pytest.fixture(autouse=True)
+def process_images_inline(settings):
+    settings.IMAGE_PROCESSING_INLINE = True
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Транзакция теста откатывается без on_commit, и сигналы не сбрасывают
+    # закэшированные страницы предыдущих тестов.
+    cache.clear()
+
+
 @pytest.fixture()
 def mock_media(settings):
     with tempfile.TemporaryDirectory() as temp_directory:
@@ -0,0 +1,105 @@
+"""Общие помощники кэша: пространства имён ключей, защита от «стада»
+(cache stampede) и статистика попаданий по префиксам ключей.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+
+MAX_KEY_LENGTH: int = 200
+LOCK_TIMEOUT: int = 10
+LOCK_POLL_INTERVAL: float = 0.05
+EARLY_RECOMPUTE_BETA: float = 1.0
+
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+
+
+def make_key(key, key_prefix, version):
+    """KEY_FUNCTION для CACHES: prefix:version:key.
+
+    Длинные ключи и ключи с пробелами хэшируются, чтобы их принимал
+    memcached.
+    """
+    full_key = f'{key_prefix}:{version}:{key}'
+    if len(full_key) > MAX_KEY_LENGTH or any(c.isspace() for c in full_key):
+        namespace = key.split(':', 1)[0]
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        full_key = f'{key_prefix}:{version}:{namespace}:{digest}'
+    return full_key
+
+
+def key_namespace(key):
+    return key.split(':', 1)[0]
+
+
+def record(key, hit):
+    with _stats_lock:
+        _stats[key_namespace(key)]['hits' if hit else 'misses'] += 1
+
+
+def get_stats():
+    """Попадания и промахи текущего процесса по префиксам ключей."""
+    with _stats_lock:
+        return {
+            namespace: {
+                'hits': counter['hits'],
+                'misses': counter['misses'],
+            }
+            for namespace, counter in sorted(_stats.items())
+        }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _is_fresh(expiry, delta, beta):
+    # XFetch: чем ближе истечение и чем дольше пересчёт, тем вероятнее,
+    # что один из запросов пересчитает значение заранее.
+    return time.time() - delta * beta * math.log(random.random()) < expiry
+
+
+def get_or_compute(key, compute, timeout, cacheable=None,
+                   beta=EARLY_RECOMPUTE_BETA):
+    """Возвращает значение из кэша или вычисляет его под блокировкой.
+
+    Пока один процесс пересчитывает значение, остальные отдают прежнее,
+    а если его нет — ждут результата не дольше LOCK_TIMEOUT. cacheable
+    решает, можно ли сохранить вычисленное значение; timeout может быть
+    функцией — тогда срок хранения выбирается после вычисления.
+    """
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(entry[2], entry[1], beta):
+        record(key, hit=True)
+        return entry[0]
+    record(key, hit=False)
+    lock_key = f'{key}:lock'
+    deadline = time.time() + LOCK_TIMEOUT
+    while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        if entry is not None:
+            return entry[0]
+        if time.time() > deadline:
+            return compute()
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    try:
+        started = time.time()
+        value = compute()
+        if cacheable is None or cacheable(value):
+            finished = time.time()
+            if callable(timeout):
+                timeout = timeout()
+            cache.set(
+                key, (value, finished - started, finished + timeout), timeout
+            )
+        return value
+    finally:
+        cache.delete(lock_key)
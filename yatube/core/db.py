@@ -0,0 +1,67 @@
+"""Настройка подключений SQLite и повтор записи при блокировке базы."""
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+RETRY_ATTEMPTS: int = 5
+RETRY_BASE_DELAY: float = 0.05
+RETRY_MAX_DELAY: float = 1.0
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Обработчик connection_created: PRAGMA из settings.SQLITE_PRAGMAS."""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
+
+
+def is_locked_error(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def backoff_delay(attempt, base_delay=RETRY_BASE_DELAY,
+                  max_delay=RETRY_MAX_DELAY):
+    """Экспоненциальная задержка с джиттером, чтобы писатели не
+    просыпались одновременно."""
+    return min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1)
+
+
+def retry_on_locked(view=None, *, attempts=RETRY_ATTEMPTS,
+                    base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """Повторяет запись, если SQLite ответил «database is locked».
+
+    busy_timeout не спасает, когда читающая транзакция в WAL пытается
+    стать пишущей по устаревшему снимку: SQLite отказывает сразу.
+    Каждая попытка идёт в своей транзакции, поэтому частичная запись
+    откатывается перед повтором. Оборачивать стоит саму запись —
+    retry_on_locked(post.save)(), — а не представление: тело запроса
+    и загруженные файлы второй раз уже не прочитать.
+    """
+    if view is None:
+        return lambda view: retry_on_locked(
+            view, attempts=attempts, base_delay=base_delay,
+            max_delay=max_delay
+        )
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        for attempt in range(attempts):
+            try:
+                with transaction.atomic():
+                    return view(*args, **kwargs)
+            except OperationalError as error:
+                if not is_locked_error(error) or attempt == attempts - 1:
+                    raise
+                time.sleep(backoff_delay(attempt, base_delay, max_delay))
+    return wrapper
@@ -0,0 +1,160 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas, backoff_delay, is_locked_error
+from core.metrics import percentile
+
+SEED_ROWS: int = 1000
+
+
+def _connect(path, pragmas):
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+    apply_pragmas(connection, pragmas)
+    return connection
+
+
+def _seed(path, pragmas):
+    connection = _connect(path, pragmas)
+    connection.execute(
+        'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, '
+        'pub_date REAL)'
+    )
+    connection.execute('CREATE INDEX post_pub_date ON post (pub_date)')
+    connection.executemany(
+        'INSERT INTO post (text, pub_date) VALUES (?, ?)',
+        (('Пост', time.time()) for _ in range(SEED_ROWS))
+    )
+    connection.close()
+
+
+def _writer(path, pragmas, writes, stats, lock):
+    connection = _connect(path, pragmas)
+    latencies, errors, retries = [], 0, 0
+    for _ in range(writes):
+        started = time.perf_counter()
+        for attempt in range(5):
+            try:
+                connection.execute('BEGIN')
+                connection.execute(
+                    'SELECT COUNT(*) FROM post WHERE pub_date > ?',
+                    (time.time() - 60,)
+                )
+                connection.execute(
+                    'INSERT INTO post (text, pub_date) VALUES (?, ?)',
+                    ('Новый пост', time.time())
+                )
+                connection.execute('COMMIT')
+                break
+            except sqlite3.OperationalError as error:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                if not is_locked_error(error) or attempt == 4:
+                    errors += 1
+                    break
+                retries += 1
+                time.sleep(backoff_delay(attempt))
+        latencies.append((time.perf_counter() - started) * 1000)
+    connection.close()
+    with lock:
+        stats['write_ms'].extend(latencies)
+        stats['errors'] += errors
+        stats['retries'] += retries
+
+
+def _reader(path, pragmas, done, stats, lock):
+    connection = _connect(path, pragmas)
+    reads = errors = 0
+    while not done.is_set():
+        try:
+            connection.execute(
+                'SELECT id, text FROM post ORDER BY pub_date DESC LIMIT 10'
+            ).fetchall()
+            reads += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    connection.close()
+    with lock:
+        stats['reads'] += reads
+        stats['read_errors'] += errors
+
+
+def run_profile(pragmas, writers, readers, writes):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'benchmark.sqlite3')
+        _seed(path, pragmas)
+        stats = {
+            'write_ms': [], 'errors': 0, 'retries': 0,
+            'reads': 0, 'read_errors': 0,
+        }
+        lock = threading.Lock()
+        done = threading.Event()
+        reader_threads = [
+            threading.Thread(
+                target=_reader, args=(path, pragmas, done, stats, lock)
+            )
+            for _ in range(readers)
+        ]
+        writer_threads = [
+            threading.Thread(
+                target=_writer, args=(path, pragmas, writes, stats, lock)
+            )
+            for _ in range(writers)
+        ]
+        started = time.perf_counter()
+        for thread in reader_threads + writer_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        for thread in reader_threads:
+            thread.join()
+    latencies = sorted(stats['write_ms'])
+    return {
+        'writes_per_s': round(len(latencies) / elapsed, 1),
+        'reads_per_s': round(stats['reads'] / elapsed, 1),
+        'write_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+        },
+        'retries': stats['retries'],
+        'failed_writes': stats['errors'],
+        'failed_reads': stats['read_errors'],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает SQLite с настройками по умолчанию и профиль production '
+        'под конкурентной записью и чтением.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument(
+            '--writes', type=int, default=200,
+            help='Транзакций записи на писателя.'
+        )
+
+    def handle(self, *args, **options):
+        profiles = {
+            'default': {},
+            'production': settings.SQLITE_PRODUCTION_PRAGMAS,
+        }
+        report = {
+            name: run_profile(
+                pragmas, options['writers'], options['readers'],
+                options['writes']
+            )
+            for name, pragmas in profiles.items()
+        }
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
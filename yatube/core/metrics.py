@@ -0,0 +1,79 @@
+"""Метрики запросов по представлениям: число и время SQL, время рендера
+шаблонов и полное время ответа.
+
+Значения хранятся в памяти процесса — последние METRICS_WINDOW замеров
+на каждое имя представления, — поэтому перцентили у каждого воркера
+свои и сбрасываются при перезапуске.
+"""
+import math
+import threading
+from collections import defaultdict, deque
+
+METRICS_WINDOW: int = 1000
+METRICS = ('queries', 'sql_ms', 'template_ms', 'total_ms')
+PERCENTILES = (50, 95, 99)
+
+_samples = defaultdict(lambda: {
+    metric: deque(maxlen=METRICS_WINDOW) for metric in METRICS
+})
+_samples_lock = threading.Lock()
+
+
+class RequestMetrics:
+    """Счётчики одного запроса; живут в request.metrics."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+
+
+def for_request(request):
+    metrics = getattr(request, 'metrics', None)
+    if metrics is None:
+        metrics = request.metrics = RequestMetrics()
+    return metrics
+
+
+def observe(view_name, **values):
+    with _samples_lock:
+        samples = _samples[view_name]
+        for metric, value in values.items():
+            samples[metric].append(value)
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга; values отсортированы."""
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def get_report():
+    """p50/p95/p99 каждой метрики по представлениям."""
+    with _samples_lock:
+        snapshot = {
+            view_name: {
+                metric: sorted(values) for metric, values in samples.items()
+            }
+            for view_name, samples in _samples.items()
+        }
+    return {
+        view_name: {
+            'count': len(samples['total_ms']),
+            **{
+                metric: {
+                    f'p{percent}': percentile(values, percent)
+                    for percent in PERCENTILES
+                }
+                for metric, values in samples.items()
+            },
+        }
+        for view_name, samples in sorted(snapshot.items())
+    }
+
+
+def reset():
+    with _samples_lock:
+        _samples.clear()
@@ -0,0 +1,50 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from . import metrics
+
+
+class InstrumentationMiddleware:
+    """Считает SQL, рендер шаблонов и время ответа по имени представления
+    и отдаёт их в заголовке Server-Timing."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = metrics.for_request(request)
+
+        def execute(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                request_metrics.queries += 1
+                request_metrics.sql += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(execute))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+        sql_ms = request_metrics.sql * 1000
+        template_ms = request_metrics.template * 1000
+        total_ms = total * 1000
+        match = request.resolver_match
+        if match is not None:
+            metrics.observe(
+                match.view_name,
+                queries=request_metrics.queries,
+                sql_ms=sql_ms,
+                template_ms=template_ms,
+                total_ms=total_ms,
+            )
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={sql_ms:.1f};desc="{request_metrics.queries} queries"',
+            f'tpl;dur={template_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ))
+        return response
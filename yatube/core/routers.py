@@ -0,0 +1,97 @@
+"""Чтение с реплик для представлений-списков.
+
+Роутер отправляет чтение на реплику, только пока выполняется
+представление, обёрнутое read_from_replica, и клиент не закреплён за
+основной базой. Запись всегда идёт в default; после неё
+ReplicaPinMiddleware ставит cookie, и следующие REPLICA_PIN_SECONDS
+секунд клиент читает с основной базы — так он видит свою запись,
+например сразу после редиректа из post_create.
+"""
+import random
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE_NAME = 'primary_pin'
+PRIMARY_ONLY_APPS = ('sessions', 'django_cache')
+
+_state = threading.local()
+
+
+def _replicas():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def replica_used():
+    """Читало ли последнее представление с read_from_replica с реплики."""
+    return getattr(_state, 'replica_used', False)
+
+
+def read_from_replica(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        previous = getattr(_state, 'use_replica', False)
+        _state.use_replica = True
+        _state.replica_used = False
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _state.use_replica = previous
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        replicas = _replicas()
+        if (
+            replicas
+            and getattr(_state, 'use_replica', False)
+            and not getattr(_state, 'pinned', False)
+        ):
+            _state.replica_used = True
+            return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_ONLY_APPS:
+            _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in _replicas():
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """Закрепляет клиента за основной базой на время после записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.pinned = PIN_COOKIE_NAME in request.COOKIES
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            if _state.wrote and _replicas():
+                response.set_cookie(
+                    PIN_COOKIE_NAME, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite='Lax'
+                )
+            return response
+        finally:
+            _state.pinned = False
+            _state.wrote = False
@@ -0,0 +1,190 @@
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from . import metrics
+from .db import configure_sqlite, retry_on_locked
+from posts.models import Post
+
+from .routers import PIN_COOKIE_NAME, replica_used
+from .cache import get_or_compute, get_stats, make_key, reset_stats
+
+User = get_user_model()
+
+
+class CacheHelpersTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_stats()
+
+    def test_make_key_is_namespaced_and_memcached_safe(self):
+        """Ключи получают префикс, длинные и с пробелами хэшируются."""
+        self.assertEqual(make_key('page:1', 'yatube', 1), 'yatube:1:page:1')
+        for key in ('page:' + 'x' * 300, 'page:with space'):
+            with self.subTest(key=key):
+                full_key = make_key(key, 'yatube', 1)
+                self.assertTrue(full_key.startswith('yatube:1:page:'))
+                self.assertLessEqual(len(full_key), 200)
+                self.assertNotIn(' ', full_key)
+
+    def test_get_or_compute_counts_hits_and_misses(self):
+        """Значение считается один раз, статистика ведётся по префиксу."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'value'
+
+        for _ in range(3):
+            self.assertEqual(get_or_compute('demo:key', compute, 60), 'value')
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(get_stats()['demo'], {'hits': 2, 'misses': 1})
+
+    def test_get_or_compute_skips_uncacheable_values(self):
+        """Значения, отвергнутые cacheable, не сохраняются."""
+        get_or_compute('demo:key', lambda: 'value', 60, cacheable=bool)
+        get_or_compute('demo:none', lambda: '', 60, cacheable=bool)
+        self.assertIsNotNone(cache.get('demo:key'))
+        self.assertIsNone(cache.get('demo:none'))
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_percentile_nearest_rank(self):
+        """Перцентиль считается методом ближайшего ранга."""
+        values = list(range(1, 101))
+        self.assertEqual(metrics.percentile(values, 50), 50)
+        self.assertEqual(metrics.percentile(values, 99), 99)
+        self.assertEqual(metrics.percentile([7], 95), 7)
+        self.assertIsNone(metrics.percentile([], 50))
+
+    def test_views_are_timed_and_reported_to_staff(self):
+        """Ответ несёт Server-Timing, а сотрудник видит перцентили."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        report = client.get(reverse('view_metrics')).json()
+        index = report['posts:index']
+        self.assertEqual(index['count'], 1)
+        self.assertGreater(index['queries']['p50'], 0)
+        self.assertGreater(index['template_ms']['p99'], 0)
+
+
+class SQLiteProfileTests(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -2048})
+    def test_pragmas_are_applied_on_connect(self):
+        """Обработчик connection_created выставляет PRAGMA профиля."""
+        configure_sqlite(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -2048)
+
+    def test_retry_on_locked_retries_only_lock_errors(self):
+        """Блокировка повторяется, другие ошибки пробрасываются сразу."""
+        calls = []
+
+        @retry_on_locked(base_delay=0)
+        def locked_twice():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        @retry_on_locked(base_delay=0)
+        def broken():
+            calls.append(1)
+            raise OperationalError('no such table: missing')
+
+        self.assertEqual(locked_twice(), 'ok')
+        self.assertEqual(len(calls), 3)
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            broken()
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_PIN_SECONDS=15)
+class ReplicaRouterTests(TestCase):
+    """Реплика — копия тестовой базы в файле SQLite, снятая до записи:
+    устаревшие данные на ней показывают, куда ушло чтение."""
+
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        # Копия снимается до транзакции TestCase: в ней только схема.
+        cls.directory = tempfile.mkdtemp()
+        path = os.path.join(cls.directory, 'replica.sqlite3')
+        replica = sqlite3.connect(path)
+        connection.ensure_connection()
+        connection.connection.backup(replica)
+        replica.close()
+        connections.databases['replica'] = {
+            **connections.databases['default'], 'NAME': path, 'TEST': {},
+        }
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Пост только в основной')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_listing_reads_replica_until_client_writes(self):
+        """Списки читаются с реплики, после записи — с основной базы."""
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'}
+        )
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'][0].text, 'Свежий пост')
+        del self.client.cookies[PIN_COOKIE_NAME]
+        cache.clear()
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_replica_pages_are_cached_briefly(self):
+        """Страница с реплики хранится в кэше не дольше окна закрепления."""
+        self.client.get(reverse('posts:index'))
+        self.assertTrue(replica_used())
+        entry = next(
+            value for key, value in cache._cache.items() if ':page:' in key
+        )
+        self.assertLessEqual(
+            pickle.loads(entry)[2] - time.time(), 15
+        )
+
+    def test_views_without_decorator_use_primary(self):
+        """Представления без read_from_replica читают основную базу."""
+        response = self.client.get(
+            reverse('posts:post_edit', args=(
+                Post.objects.get(author=self.user).pk,
+            ))
+        )
+        self.assertEqual(
+            response.context['form'].instance.text, 'Пост только в основной'
+        )
@@ -1,27 +1,83 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import Max
+from django.utils.functional import cached_property
 
+from . import search
+from .counters import change_posts_count
 from .models import Follow, Post, Group
 
 
+class EstimatedCountPaginator(Paginator):
+    """Без фильтров оценивает число строк по MAX(id) вместо COUNT(*).
+
+    После удалений оценка завышена: последние страницы могут оказаться
+    пустыми, зато changelist не сканирует таблицу целиком.
+    """
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        if query.where or query.distinct:
+            return super().count
+        return self.object_list.aggregate(last=Max('pk'))['last'] or 0
+
+
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
-    empty_value_display = '-dусто-'
+    date_hierarchy = 'pub_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if db_field.name == 'group':
+            # Список групп читается один раз, а не в каждой строке
+            # list_editable.
+            formfield.choices = list(formfield.choices)
+        return formfield
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.is_available(queryset.db):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        match = search.build_match(search_term)
+        if not match:
+            return queryset.none(), False
+        return queryset.filter(pk__in=search.matching_ids(match)), False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'author' in form.changed_data:
+            change_posts_count(form.initial['author'], -1)
+            change_posts_count(obj.author_id, 1)
 
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'description', "slug")
     search_fields = ('title', 'description',)
-    list_filter = ('title', 'description',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'author')
-    search_fields = ('text',)
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
@@ -0,0 +1,315 @@
+"""Нагрузочный прогон всех маршрутов posts на синтетических данных.
+
+Данные генерирует Faker и загружает posts.importer — тем же путём, что
+и боевой импорт, поэтому счётчики и ленты подписок заполнены. Маршруты
+идут через тестовый клиент Django; для каждого собираются пропускная
+способность, перцентили задержки и число SQL-запросов.
+"""
+import platform
+import random
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+from io import BytesIO
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from core.metrics import PERCENTILES, percentile
+
+from .importer import Importer
+from .models import Comment, Group, Post
+from .utils import COMMENT_ORDERING, encode_cursor
+
+User = get_user_model()
+
+BENCHMARK_SEED: int = 2022
+BENCHMARK_REQUESTS: int = 50
+BENCHMARK_WARMUP: int = 5
+BENCHMARK_THRESHOLD: float = 0.2
+BENCHMARK_IMAGE_EVERY: int = 10
+STAFF_USERNAME = 'benchmark_staff'
+
+
+def generate_records(users=200, groups=20, posts=5000, comments=3,
+                     follows=20, seed=BENCHMARK_SEED, now=None):
+    """Записи в формате posts.export: посты с комментариями и подписки.
+
+    Даты отсчитываются назад от now, остальное определяется seed.
+    """
+    Faker.seed(seed)
+    fake = Faker('ru_RU')
+    rng = random.Random(seed)
+    usernames = [f'{fake.user_name()}_{i}' for i in range(users)]
+    slugs = [f'{fake.slug()}-{i}' for i in range(groups)]
+    now = now or timezone.now()
+    for i in range(posts):
+        pub_date = now - timedelta(minutes=posts - i)
+        yield {
+            'pub_date': pub_date.isoformat(),
+            'author': rng.choice(usernames),
+            'group': rng.choice(slugs) if rng.random() < 0.7 else None,
+            'text': fake.text(max_nb_chars=400),
+            'image': '',
+            'comments': [
+                {
+                    'author': rng.choice(usernames),
+                    'text': fake.sentence(),
+                    'created': (
+                        pub_date + timedelta(seconds=j + 1)
+                    ).isoformat(),
+                }
+                for j in range(rng.randint(0, comments * 2))
+            ],
+        }
+    for username in usernames:
+        for author in rng.sample(usernames, min(follows, users)):
+            yield {'type': 'follow', 'user': username, 'author': author}
+
+
+def seed_images(every=BENCHMARK_IMAGE_EVERY):
+    """Даёт картинку каждому every-му посту, чтобы карточки и
+    posts:post_thumbnail работали с миниатюрами."""
+    source = BytesIO()
+    Image.new('RGB', (1200, 800), 'teal').save(source, 'JPEG')
+    name = Post._meta.get_field('image').storage.save(
+        'posts/benchmark.jpg', ContentFile(source.getvalue())
+    )
+    post_ids = Post.objects.order_by('pk').values_list('pk', flat=True)
+    Post.objects.filter(pk__in=list(post_ids)[::every]).update(image=name)
+
+
+def seed_database(**sizes):
+    rows = Importer().run(generate_records(**sizes))
+    seed_images()
+    User.objects.create_user(username=STAFF_USERNAME, is_staff=True)
+    return rows
+
+
+class Fixtures:
+    """Случайные, но воспроизводимые объекты для параметров маршрутов."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.post_ids = list(
+            Post.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        self.export_since_id = self.post_ids[-min(100, len(self.post_ids))]
+        self.usernames = list(
+            User.objects.filter(posts__isnull=False).distinct().values_list(
+                'username', flat=True
+            )
+        )
+        self.slugs = list(Group.objects.values_list('slug', flat=True))
+        self.words = [
+            word
+            for text in Post.objects.values_list('text', flat=True)[:50]
+            for word in text.split()[:3]
+        ]
+        self.user = User.objects.get(username=self.usernames[0])
+        self.staff = User.objects.get(username=STAFF_USERNAME)
+        self.own_post_id = self.user.posts.values_list(
+            'pk', flat=True
+        ).first()
+        self.image_post_ids = list(
+            Post.objects.exclude(image='').order_by('pk').values_list(
+                'pk', flat=True
+            )
+        )
+        # Курсор после комментария, за которым в посте есть ещё: фрагмент
+        # отдаёт их, как при нажатии «ещё» на странице поста.
+        keys = [field.lstrip('-') for field in COMMENT_ORDERING]
+        comments = list(
+            Comment.objects.order_by('post', *COMMENT_ORDERING).values_list(
+                'post', *keys
+            )[:500]
+        )
+        self.comment_cursors = [
+            (post_id, encode_cursor(key))
+            for (post_id, *key), (next_post_id, *_) in zip(
+                comments, comments[1:]
+            )
+            if post_id == next_post_id
+        ]
+
+    def post_id(self):
+        return self.rng.choice(self.post_ids)
+
+    def username(self):
+        return self.rng.choice(self.usernames)
+
+    def comments_fragment(self):
+        post_id, cursor = self.rng.choice(self.comment_cursors)
+        return (
+            reverse('posts:post_comments', args=(post_id,)),
+            {'cursor': cursor}
+        )
+
+
+def scenarios(fixtures):
+    """(имя, кто, метод, функция, дающая url и данные) для каждого
+    маршрута posts/urls.py."""
+    return [
+        ('index', None, 'get', lambda: (
+            reverse('posts:index'),
+            {'page': fixtures.rng.randint(1, 20)}
+        )),
+        ('group_list', None, 'get', lambda: (
+            reverse('posts:group_list', args=(
+                fixtures.rng.choice(fixtures.slugs),
+            )), {}
+        )),
+        ('profile', 'user', 'get', lambda: (
+            reverse('posts:profile', args=(fixtures.username(),)), {}
+        )),
+        ('post_detail', None, 'get', lambda: (
+            reverse('posts:post_detail', args=(fixtures.post_id(),)), {}
+        )),
+        ('post_comments', None, 'get', lambda: (
+            fixtures.comments_fragment()
+        )),
+        ('post_thumbnail', None, 'get', lambda: (
+            reverse('posts:post_thumbnail', args=(
+                fixtures.rng.choice(fixtures.image_post_ids),
+            )), {}
+        )),
+        ('post_create', 'user', 'post', lambda: (
+            reverse('posts:post_create'), {'text': 'Пост из бенчмарка'}
+        )),
+        ('post_edit', 'user', 'get', lambda: (
+            reverse('posts:post_edit', args=(fixtures.own_post_id,)), {}
+        )),
+        ('add_comment', 'user', 'post', lambda: (
+            reverse('posts:add_comment', args=(fixtures.post_id(),)),
+            {'text': 'Комментарий из бенчмарка'}
+        )),
+        ('follow_index', 'user', 'get', lambda: (
+            reverse('posts:follow_index'), {}
+        )),
+        ('search', None, 'get', lambda: (
+            reverse('posts:search'),
+            {'q': fixtures.rng.choice(fixtures.words)}
+        )),
+        ('export_posts', 'staff', 'get', lambda: (
+            reverse('posts:export_posts'),
+            {'since_id': fixtures.export_since_id}
+        )),
+        ('profile_follow', 'user', 'get', lambda: (
+            reverse('posts:profile_follow', args=(fixtures.username(),)), {}
+        )),
+        ('profile_unfollow', 'user', 'get', lambda: (
+            reverse('posts:profile_unfollow', args=(fixtures.username(),)),
+            {}
+        )),
+    ]
+
+
+def _request(client, method, url, data):
+    response = getattr(client, method)(url, data)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def _summary(latencies, queries, elapsed):
+    latencies = sorted(latencies)
+    queries = sorted(queries)
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'latency_ms': {
+            f'p{percent}': round(percentile(latencies, percent), 3)
+            for percent in PERCENTILES
+        },
+        'queries': {
+            'p50': percentile(queries, 50),
+            'max': queries[-1],
+        },
+    }
+
+
+def run(requests=BENCHMARK_REQUESTS, warmup=BENCHMARK_WARMUP,
+        seed=BENCHMARK_SEED, cold=False, only=None):
+    """Прогоняет маршруты и возвращает отчёт, пригодный для JSON."""
+    rng = random.Random(seed)
+    fixtures = Fixtures(rng)
+    clients = {None: Client()}
+    for role in ('user', 'staff'):
+        clients[role] = Client()
+        clients[role].force_login(getattr(fixtures, role))
+    counter = {'queries': 0}
+
+    def count(execute, sql, params, many, context):
+        counter['queries'] += 1
+        return execute(sql, params, many, context)
+
+    routes = {}
+    for name, role, method, build in scenarios(fixtures):
+        if only and name not in only:
+            continue
+        client = clients[role]
+        cache.clear()
+        for _ in range(warmup):
+            _request(client, method, *build())
+        latencies, queries = [], []
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            started = time.perf_counter()
+            for _ in range(requests):
+                url, data = build()
+                if cold:
+                    cache.clear()
+                counter['queries'] = 0
+                request_started = time.perf_counter()
+                response = _request(client, method, url, data)
+                latencies.append(
+                    (time.perf_counter() - request_started) * 1000
+                )
+                queries.append(counter['queries'])
+                if response.status_code >= 400:
+                    raise RuntimeError(
+                        f'{name}: {url} вернул {response.status_code}'
+                    )
+            elapsed = time.perf_counter() - started
+        routes[name] = _summary(latencies, queries, elapsed)
+    return {
+        'meta': {
+            'seed': seed,
+            'requests': requests,
+            'cold': cold,
+            'posts': len(fixtures.post_ids),
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'created': timezone.now().isoformat(),
+        },
+        'routes': routes,
+    }
+
+
+def compare(report, baseline, threshold=BENCHMARK_THRESHOLD):
+    """Регрессии относительно baseline: рост p95 задержки или медианного
+    числа запросов больше чем на threshold."""
+    regressions = []
+    for name, current in report['routes'].items():
+        previous = baseline.get('routes', {}).get(name)
+        if previous is None:
+            continue
+        checks = (
+            ('latency_ms.p95', current['latency_ms']['p95'],
+             previous['latency_ms']['p95']),
+            ('queries.p50', current['queries']['p50'],
+             previous['queries']['p50']),
+        )
+        for metric, value, old in checks:
+            if value > old * (1 + threshold):
+                regressions.append(f'{name} {metric}: {old} → {value}')
+    return regressions
@@ -0,0 +1,124 @@
+"""Кэш отрендеренных страниц с инвалидацией через счётчики поколений.
+
+Ключ страницы включает текущие номера поколений её областей (scopes).
+Сигналы моделей увеличивают номер поколения, и все страницы области
+сразу перестают находиться в кэше, поэтому их можно хранить долго.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from core.cache import get_or_compute, record
+from core.routers import replica_used
+
+PAGE_CACHE_TIMEOUT: int = 60 * 60 * 24
+GENERATION_KEY_PREFIX = 'gen:'
+PAGE_KEY_PREFIX = 'page:'
+
+
+def _generation_key(scope):
+    return f'{GENERATION_KEY_PREFIX}{scope}'
+
+
+def _initial_generation():
+    # Счётчик, вытесненный из кэша, не должен вернуться к старому номеру и
+    # воскресить устаревшие страницы, поэтому начинаем с текущего времени.
+    return time.time_ns()
+
+
+def bump_generation(*scopes):
+    """Сбрасывает все закэшированные страницы указанных областей."""
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_generation(), timeout=None)
+
+
+def get_generations(scopes):
+    keys = [_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        record(key, hit=key in generations)
+        if key not in generations:
+            cache.add(key, _initial_generation(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def page_cache_key(request, scopes):
+    generations = get_generations(scopes)
+    raw = '|'.join((
+        request.get_full_path(),
+        str(request.user.pk or 0),
+        ','.join(map(str, generations)),
+    ))
+    return PAGE_KEY_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+
+def cache_page_by_generation(*scopes, timeout=PAGE_CACHE_TIMEOUT):
+    """Кэширует ответ представления до смены поколения его областей.
+
+    Области могут ссылаться на аргументы URL: 'post:{post_id}'. Ответы,
+    в которых выдавался CSRF-токен, не кэшируются: токен привязан к cookie
+    конкретного браузера. Страница, прочитанная с реплики, могла отстать
+    от записи, уже сменившей поколение, поэтому хранится не дольше
+    REPLICA_PIN_SECONDS.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            key = page_cache_key(
+                request, [scope.format(**kwargs) for scope in scopes]
+            )
+            return get_or_compute(
+                key,
+                lambda: view(request, *args, **kwargs),
+                lambda: (
+                    min(timeout, settings.REPLICA_PIN_SECONDS)
+                    if replica_used() else timeout
+                ),
+                cacheable=lambda response: (
+                    response.status_code == 200
+                    and not request.META.get('CSRF_COOKIE_USED')
+                )
+            )
+        return wrapper
+    return decorator
+
+
+def conditional_by_generation(*scopes, last_modified):
+    """Условный GET: 304 до рендера и запросов списка.
+
+    Валидатор — только ETag: он складывается из last_modified(**kwargs
+    URL), дешёвого агрегата по индексу, поколений областей, чтобы учесть
+    правки без отметки времени, и состояния зрителя: пользователя и
+    CSRF-cookie, которые попадают в HTML. Заголовок Last-Modified не
+    отдаётся: по одному If-Modified-Since нельзя заметить ни правку
+    текста, ни вход пользователя.
+    """
+    def get_last_modified(request, *args, **kwargs):
+        if not hasattr(request, '_page_last_modified'):
+            request._page_last_modified = last_modified(**kwargs)
+        return request._page_last_modified
+
+    def get_etag(request, *args, **kwargs):
+        generations = get_generations(
+            [scope.format(**kwargs) for scope in scopes]
+        )
+        raw = '|'.join((
+            ','.join(map(str, generations)),
+            str(get_last_modified(request, *args, **kwargs)),
+            str(request.user.pk or 0),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ))
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    return condition(etag_func=get_etag)
@@ -0,0 +1,80 @@
+"""Счётчики постов автора и комментариев поста.
+
+AuthorProfile.posts_count меняется сигналами Post; массовые операции в
+обход сигналов (bulk_create, QuerySet.update) нужно досчитать
+reconcile_posts_count(). Число комментариев поста хранится в кэше и
+сбрасывается сигналами Comment.
+"""
+from django.core.cache import cache
+from django.db.models import Count, F
+
+from core.cache import get_or_compute
+
+from .models import AuthorProfile, Comment, Post
+
+RECONCILE_BATCH_SIZE: int = 500
+COMMENT_COUNT_TIMEOUT: int = 60 * 60
+COMMENT_COUNT_KEY_PREFIX = 'comment-count:'
+
+
+def change_posts_count(author_id, delta):
+    profiles = AuthorProfile.objects.filter(user_id=author_id)
+    if delta < 0:
+        profiles = profiles.filter(posts_count__gte=-delta)
+    updated = profiles.update(posts_count=F('posts_count') + delta)
+    if not updated and delta > 0:
+        # Профиля ещё нет: создаём его сразу с точным значением.
+        AuthorProfile.objects.get_or_create(
+            user_id=author_id,
+            defaults={
+                'posts_count': Post.objects.filter(
+                    author_id=author_id
+                ).count()
+            }
+        )
+
+
+def reconcile_posts_count(author_ids=None):
+    """Пересчитывает счётчики и возвращает число исправленных профилей."""
+    actual = Post.objects.order_by().values('author').annotate(
+        total=Count('pk')
+    )
+    profiles = AuthorProfile.objects.all()
+    if author_ids is not None:
+        actual = actual.filter(author__in=author_ids)
+        profiles = profiles.filter(user__in=author_ids)
+    totals = {row['author']: row['total'] for row in actual}
+    stale = []
+    for profile in profiles.iterator():
+        total = totals.pop(profile.user_id, 0)
+        if profile.posts_count != total:
+            profile.posts_count = total
+            stale.append(profile)
+    AuthorProfile.objects.bulk_update(
+        stale, ['posts_count'], batch_size=RECONCILE_BATCH_SIZE
+    )
+    AuthorProfile.objects.bulk_create(
+        [
+            AuthorProfile(user_id=user_id, posts_count=total)
+            for user_id, total in totals.items()
+        ],
+        batch_size=RECONCILE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    return len(stale) + len(totals)
+
+
+def _comment_count_key(post_id):
+    return f'{COMMENT_COUNT_KEY_PREFIX}{post_id}'
+
+
+def get_comment_count(post_id):
+    return get_or_compute(
+        _comment_count_key(post_id),
+        lambda: Comment.objects.filter(post_id=post_id).count(),
+        COMMENT_COUNT_TIMEOUT
+    )
+
+
+def reset_comment_count(post_id):
+    cache.delete(_comment_count_key(post_id))
@@ -0,0 +1,102 @@
+"""Потоковая выгрузка постов с комментариями в NDJSON и CSV.
+
+Посты читаются QuerySet.iterator(), комментарии — одним запросом на
+пачку постов, поэтому память не зависит от размера выгрузки.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comment, Post
+
+EXPORT_CHUNK_SIZE: int = 1000
+EXPORT_FORMATS = ('ndjson', 'csv')
+CSV_FIELDS = ('id', 'pub_date', 'author', 'group', 'text', 'image',
+              'comments')
+
+
+def parse_since(value):
+    """Дата или дата-время для инкрементальной выгрузки; None — ошибка,
+    в том числе для несуществующей даты вроде 2024-02-30."""
+    try:
+        return parse_datetime(value) or parse_date(value)
+    except ValueError:
+        return None
+
+
+def export_queryset(since_id=None, since=None):
+    queryset = Post.objects.select_related('author', 'group').order_by('pk')
+    if since_id is not None:
+        queryset = queryset.filter(pk__gt=since_id)
+    if since is not None:
+        queryset = queryset.filter(pub_date__gt=since)
+    return queryset
+
+
+def _records(posts):
+    comments = {}
+    for comment in Comment.objects.filter(
+        post__in=[post.pk for post in posts]
+    ).select_related('author').order_by('post', 'created', 'pk'):
+        comments.setdefault(comment.post_id, []).append({
+            'id': comment.pk,
+            'author': comment.author.username if comment.author else None,
+            'text': comment.text,
+            'created': comment.created,
+        })
+    for post in posts:
+        yield {
+            'id': post.pk,
+            'pub_date': post.pub_date,
+            'author': post.author.username,
+            'group': post.group.slug if post.group else None,
+            'text': post.text,
+            'image': post.image.name,
+            'comments': comments.get(post.pk, []),
+        }
+
+
+def iter_records(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    chunk = []
+    for post in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(post)
+        if len(chunk) == chunk_size:
+            yield from _records(chunk)
+            chunk = []
+    yield from _records(chunk)
+
+
+def _to_json(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def iter_ndjson(records):
+    for record in records:
+        yield _to_json(record) + '\n'
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(records):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for record in records:
+        record['pub_date'] = record['pub_date'].isoformat()
+        record['comments'] = _to_json(record['comments'])
+        yield writer.writerow(
+            [record[field] for field in CSV_FIELDS]
+        )
+
+
+def iter_export(export_format, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    records = iter_records(queryset, chunk_size)
+    if export_format == 'csv':
+        return iter_csv(records)
+    return iter_ndjson(records)
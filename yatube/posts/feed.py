@@ -0,0 +1,158 @@
+"""Лента подписок с раздачей постов при записи (fan-out-on-write).
+
+Новый пост копируется в FeedEntry каждого подписчика автора, поэтому
+чтение ленты — один проход по индексу (user, -pub_date). Посты
+«знаменитостей» с огромным числом подписчиков не раздаются: их ленты
+дочитывают при запросе (fan-out-on-read). Когда автор перестаёт быть
+знаменитостью, его последние посты раздаются всем подписчикам: иначе
+пропущенные посты исчезли бы из их лент.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .follow_graph import get_following_ids
+from .models import AuthorProfile, FeedEntry, Follow, Post
+
+FEED_BACKFILL_SIZE: int = 100
+FEED_CELEBRITY_FOLLOWERS: int = 5000
+FEED_CELEBRITY_CACHE_KEY = 'feed:celebrities'
+FEED_CELEBRITY_CACHE_TIMEOUT: int = 600
+FEED_BATCH_SIZE: int = 500
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_celebrity_ids():
+    """Множество id авторов, чьи посты не раздаются по лентам."""
+    celebrity_ids = cache.get(FEED_CELEBRITY_CACHE_KEY)
+    if celebrity_ids is None:
+        threshold = _setting(
+            'FEED_CELEBRITY_FOLLOWERS', FEED_CELEBRITY_FOLLOWERS
+        )
+        celebrity_ids = set(
+            Follow.objects.values('author').annotate(
+                followers=Count('id')
+            ).filter(followers__gte=threshold).values_list(
+                'author', flat=True
+            )
+        )
+        _sync_celebrities(celebrity_ids)
+        cache.set(
+            FEED_CELEBRITY_CACHE_KEY,
+            celebrity_ids,
+            _setting(
+                'FEED_CELEBRITY_CACHE_TIMEOUT', FEED_CELEBRITY_CACHE_TIMEOUT
+            )
+        )
+    return celebrity_ids
+
+
+def _bulk_insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, FEED_BATCH_SIZE))
+        if not batch:
+            return
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def _sync_celebrities(celebrity_ids):
+    """Отмечает знаменитостей в профилях. Бывшим знаменитостям раздаёт
+    последние посты: подписчики не получали их, пока автор был в
+    множестве."""
+    AuthorProfile.objects.filter(
+        user_id__in=celebrity_ids, is_celebrity=False
+    ).update(is_celebrity=True)
+    former_ids = list(
+        AuthorProfile.objects.filter(is_celebrity=True).exclude(
+            user_id__in=celebrity_ids
+        ).values_list('user_id', flat=True)
+    )
+    for author_id in former_ids:
+        backfill_followers(author_id)
+    AuthorProfile.objects.filter(user_id__in=former_ids).update(
+        is_celebrity=False
+    )
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if post.author_id in get_celebrity_ids():
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in follower_ids
+    )
+
+
+def _recent_posts(author_id):
+    size = _setting('FEED_BACKFILL_SIZE', FEED_BACKFILL_SIZE)
+    return list(
+        Post.objects.filter(author_id=author_id).values_list(
+            'id', 'pub_date'
+        )[:size]
+    )
+
+
+def backfill_authors(followers):
+    """Добавляет последние посты авторов в ленты читателей; followers —
+    словарь {author_id: id читателей}. Посты читаются одним запросом на
+    автора, строки всех авторов вставляются общими пачками, уже
+    разложенные пропускаются."""
+    _bulk_insert(
+        FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for author_id, user_ids in followers.items()
+        for post_id, pub_date in _recent_posts(author_id)
+        for user_id in user_ids
+    )
+
+
+def backfill_followers(author_id, user_ids=None):
+    """Добавляет последние посты автора в ленты user_ids, по умолчанию —
+    всех его подписчиков."""
+    if user_ids is None:
+        user_ids = list(
+            Follow.objects.filter(author_id=author_id).values_list(
+                'user_id', flat=True
+            )
+        )
+    backfill_authors({author_id: user_ids})
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту читателя последние посты нового автора."""
+    if author_id in get_celebrity_ids():
+        return
+    backfill_followers(author_id, [user_id])
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты читателя посты автора, от которого он отписался."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def get_feed(user):
+    """Queryset постов ленты подписок пользователя.
+
+    Если среди подписок нет знаменитостей, лента читается только из
+    FeedEntry. Иначе к ней добавляются посты знаменитостей напрямую.
+    """
+    followed_celebrities = get_following_ids(user) & get_celebrity_ids()
+    if followed_celebrities:
+        return Post.objects.filter(
+            Q(pk__in=FeedEntry.objects.filter(user=user).values('post_id'))
+            | Q(author_id__in=followed_celebrities)
+        )
+    return Post.objects.filter(feed_entries__user=user).order_by(
+        '-feed_entries__pub_date'
+    )
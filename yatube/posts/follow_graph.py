@@ -0,0 +1,44 @@
+"""Кэш графа подписок: множество id авторов, на которых подписан
+пользователь.
+
+Проверка «подписан ли» сводится к поиску в множестве. Множество
+сбрасывается сигналами Follow и собирается заново при следующем чтении.
+"""
+from django.core.cache import cache
+
+from core.cache import get_or_compute
+
+from .models import Follow
+
+FOLLOWING_KEY_PREFIX = 'following:'
+FOLLOWING_CACHE_TIMEOUT: int = 60 * 60 * 24
+
+
+def _following_key(user_id):
+    return f'{FOLLOWING_KEY_PREFIX}{user_id}'
+
+
+def following_queryset(user_id):
+    """Запрос, которым множество собирается при промахе кэша."""
+    return Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', flat=True
+    )
+
+
+def get_following_ids(user):
+    """frozenset id авторов; у анонима подписок нет и в кэш не ходим."""
+    if not user.is_authenticated:
+        return frozenset()
+    return get_or_compute(
+        _following_key(user.pk),
+        lambda: frozenset(following_queryset(user.pk)),
+        FOLLOWING_CACHE_TIMEOUT
+    )
+
+
+def is_following(user, author_id):
+    return author_id in get_following_ids(user)
+
+
+def invalidate_following(*user_ids):
+    cache.delete_many([_following_key(user_id) for user_id in user_ids])
@@ -0,0 +1,65 @@
+"""Преобразования картинок без Django.
+
+Модуль не импортирует Django, поэтому render_variants, принимающую и
+возвращающую байты, можно выполнять в отдельных процессах: воркер
+импортирует только этот модуль и Pillow.
+"""
+import base64
+from io import BytesIO
+
+from PIL import Image, ImageOps, features
+
+VARIANT_QUALITY = {'WEBP': 80, 'JPEG': 82}
+PLACEHOLDER_WIDTH: int = 16
+PLACEHOLDER_FORMAT = 'WEBP' if features.check('webp') else 'PNG'
+PLACEHOLDER_COLORS: int = 4
+
+
+def render_variants(data, widths, formats, aspect):
+    """Кадрирует картинку по центру под aspect (ширина, высота) и
+    сохраняет её в каждой ширине и формате.
+
+    Ширины больше исходной пропускаются, но самая узкая создаётся
+    всегда. Возвращает список (format, width, height, bytes).
+    """
+    with Image.open(BytesIO(data)) as source:
+        source = source.convert('RGB')
+        allowed = [width for width in widths if width <= source.width]
+        variants = []
+        for width in allowed or [min(widths)]:
+            height = max(1, round(width * aspect[1] / aspect[0]))
+            image = ImageOps.fit(source, (width, height), Image.LANCZOS)
+            for image_format in formats:
+                output = BytesIO()
+                image.save(
+                    output, image_format,
+                    quality=VARIANT_QUALITY.get(image_format, 80)
+                )
+                variants.append(
+                    (image_format, width, height, output.getvalue())
+                )
+        return variants
+
+
+def preview(image, aspect):
+    """Заглушка для карточки и основной цвет картинки.
+
+    Заглушка — копия шириной PLACEHOLDER_WIDTH с пропорциями aspect
+    в виде data URI, браузер растягивает и размывает её сам. Основной
+    цвет — самый частый из PLACEHOLDER_COLORS цветов палитры.
+    """
+    image = image.convert('RGB')
+    height = max(1, round(PLACEHOLDER_WIDTH * aspect[1] / aspect[0]))
+    small = ImageOps.fit(image, (PLACEHOLDER_WIDTH, height), Image.BOX)
+    output = BytesIO()
+    small.save(output, PLACEHOLDER_FORMAT)
+    placeholder = 'data:image/{};base64,{}'.format(
+        PLACEHOLDER_FORMAT.lower(),
+        base64.b64encode(output.getvalue()).decode('ascii')
+    )
+    sample = image.copy()
+    sample.thumbnail((64, 64), Image.BOX)
+    palette = sample.quantize(PLACEHOLDER_COLORS)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+    return placeholder, f'#{red:02x}{green:02x}{blue:02x}'
@@ -0,0 +1,141 @@
+"""Приём картинок постов: ограничение размера, очистка метаданных и
+перекодирование вне потока запроса.
+
+Оригинал с телефона может весить десятки мегабайт, а sorl декодирует
+его для каждой миниатюры. После сохранения поста картинка в фоне
+поворачивается по EXIF, уменьшается до IMAGE_MAX_SIDE, пересохраняется
+в IMAGE_FORMAT без метаданных, и в Post записываются её размеры,
+крошечная заглушка и основной цвет для карточек.
+
+С IMAGE_PROCESSING_INLINE = True (тесты) картинка обрабатывается сразу
+после фиксации в том же потоке, без пулов потоков и процессов.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps, features
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .caching import bump_generation
+from .image_ops import preview
+from .models import Post
+from .thumbnails import generate_thumbnails, get_executor
+from .variants import VARIANT_ASPECT, generate_variants
+
+IMAGE_MAX_SIDE: int = 2048
+IMAGE_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+IMAGE_QUALITY: int = 82
+IMAGE_EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg'}
+IMAGE_METADATA_FIELDS = (
+    'image_width', 'image_height', 'image_variants', 'image_placeholder',
+    'image_color',
+)
+
+logger = logging.getLogger(__name__)
+
+
+def encode_image(source):
+    """Байты перекодированной картинки, её размеры (width, height) и
+    заглушка с основным цветом для карточки."""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.LANCZOS)
+        if IMAGE_FORMAT == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+            has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (
+                image.mode == 'P' and 'transparency' in image.info
+            )
+            mode = 'RGBA' if has_alpha and IMAGE_FORMAT != 'JPEG' else 'RGB'
+            image = image.convert(mode)
+        output = BytesIO()
+        # Без exif= и icc_profile= Pillow не переносит метаданные.
+        image.save(output, IMAGE_FORMAT, quality=IMAGE_QUALITY)
+        return output.getvalue(), image.size, preview(image, VARIANT_ASPECT)
+
+
+def delete_unreferenced(name):
+    """Удаляет файл картинки, если ни один пост на него не ссылается.
+
+    Хранилище адресует файлы по содержимому, и одна картинка может
+    принадлежать нескольким постам. Миниатюры sorl удаляются вместе с ним.
+    """
+    if Post.objects.filter(image=name).exists():
+        return False
+    storage = Post._meta.get_field('image').storage
+    default.kvstore.delete(ImageFile(name, storage))
+    storage.delete(name)
+    return True
+
+
+def ingest_image(post_id):
+    """Перекодирует картинку поста; True, если пост обновлён.
+
+    Если пока шла обработка картинку поменяли, результат выбрасывается:
+    строка обновляется только при прежнем значении image.
+    """
+    name = Post.objects.filter(pk=post_id).values_list(
+        'image', flat=True
+    ).first()
+    if not name:
+        return False
+    storage = Post._meta.get_field('image').storage
+    with storage.open(name) as source:
+        content, (width, height), (placeholder, color) = encode_image(
+            source
+        )
+    stem = os.path.splitext(name)[0]
+    new_name = storage.save(
+        stem + IMAGE_EXTENSIONS[IMAGE_FORMAT], ContentFile(content)
+    )
+    updated = Post.objects.filter(pk=post_id, image=name).update(
+        image=new_name, image_width=width, image_height=height,
+        image_variants='', image_placeholder=placeholder, image_color=color
+    )
+    if not updated:
+        delete_unreferenced(new_name)
+        return False
+    if new_name != name:
+        delete_unreferenced(name)
+    bump_generation('posts', f'post:{post_id}')
+    return True
+
+
+def process_post_image(post_id):
+    """Принимает картинку поста и создаёт её варианты, а если их
+    создать нельзя — миниатюры sorl. Ошибки пишутся в лог."""
+    try:
+        ingest_image(post_id)
+        if generate_variants(post_id):
+            return
+        image = Post.objects.filter(pk=post_id).values_list(
+            'image', flat=True
+        ).first()
+        if image:
+            generate_thumbnails(image)
+    except Exception:
+        logger.exception('Не удалось обработать картинку поста %s', post_id)
+
+
+def _process_in_background(post_id):
+    try:
+        process_post_image(post_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_image_processing(post):
+    """Ставит приём картинки и её варианты в пул после фиксации
+    транзакции, а с IMAGE_PROCESSING_INLINE выполняет их сразу."""
+    if not post.image:
+        return
+    post_id = post.pk
+    if getattr(settings, 'IMAGE_PROCESSING_INLINE', False):
+        transaction.on_commit(lambda: process_post_image(post_id))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_process_in_background, post_id)
+    )
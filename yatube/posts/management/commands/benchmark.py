@@ -0,0 +1,111 @@
+import json
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет временную базу синтетическими данными, прогоняет все '
+        'маршруты posts и сохраняет результаты в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument(
+            '--comments', type=int, default=3,
+            help='Среднее число комментариев на пост.'
+        )
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок на пользователя.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=benchmark.BENCHMARK_SEED
+        )
+        parser.add_argument(
+            '--requests', type=int, default=benchmark.BENCHMARK_REQUESTS,
+            help='Замеряемых запросов на маршрут.'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=benchmark.BENCHMARK_WARMUP
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--route', action='append', dest='routes',
+            help='Прогнать только этот маршрут; можно повторять.'
+        )
+        parser.add_argument(
+            '--output', help='Файл для результатов; по умолчанию stdout.'
+        )
+        parser.add_argument(
+            '--baseline', help='JSON прошлого прогона для сравнения.'
+        )
+        parser.add_argument(
+            '--threshold', type=float,
+            default=benchmark.BENCHMARK_THRESHOLD,
+            help='Допустимый относительный рост, по умолчанию 0.2.'
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as stream:
+                baseline = json.load(stream)
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        try:
+            benchmark.seed_database(
+                users=options['users'],
+                groups=options['groups'],
+                posts=options['posts'],
+                comments=options['comments'],
+                follows=options['follows'],
+                seed=options['seed'],
+            )
+            report = benchmark.run(
+                requests=options['requests'],
+                warmup=options['warmup'],
+                seed=options['seed'],
+                cold=options['cold'],
+                only=options['routes'],
+            )
+        except RuntimeError as error:
+            raise CommandError(error)
+        finally:
+            media.disable()
+            shutil.rmtree(media_root, ignore_errors=True)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                stream.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        if baseline is None:
+            return
+        regressions = benchmark.compare(
+            report, baseline, options['threshold']
+        )
+        if regressions:
+            raise CommandError(
+                'Регрессии производительности:\n' + '\n'.join(regressions)
+            )
+        self.stderr.write(self.style.SUCCESS('Регрессий нет.'))
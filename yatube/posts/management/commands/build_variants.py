@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.variants import generate_variants
+
+
+def _build(post_id):
+    try:
+        return generate_variants(post_id), None
+    except Exception as error:
+        return False, f'{post_id}: {error}'
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ('Создаёт адаптивные варианты картинок для постов, у которых '
+            'их ещё нет. Картинки вне адресного хранилища пропускаются — '
+            'сначала выполните rehome_media.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Потоки, которые читают файлы и ждут пул процессов.'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать варианты и для постов, где они уже есть.'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(image_variants='')
+        post_ids = list(posts.order_by('pk').values_list('pk', flat=True))
+        done = skipped = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for built, error in pool.map(_build, post_ids):
+                if error:
+                    failed += 1
+                    self.stderr.write(error)
+                elif built:
+                    done += 1
+                else:
+                    skipped += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done}, пропущено: {skipped}, с ошибками: {failed}'
+        ))
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import feed
+from posts.follow_graph import following_queryset
+from posts.models import Post
+from posts.utils import POSTS_PER_PAGE, get_comments_paginator
+
+User = get_user_model()
+
+
+def view_querysets(user_id, group_id, post_id):
+    """Запросы, которые выполняют страницы приложения posts.
+
+    Проверка подписки идёт через кэш posts.follow_graph, поэтому для
+    профиля показан запрос, которым кэш собирается при промахе.
+    Комментарии читаются keyset-пагинацией: первая страница и страница
+    после её курсора, если она есть.
+    """
+    user = User(pk=user_id)
+    comments = get_comments_paginator(Post(pk=post_id))
+    querysets = {
+        'posts:index': (
+            Post.objects.for_listing()[:POSTS_PER_PAGE],
+        ),
+        'posts:group_list': (
+            Post.objects.filter(group_id=group_id).for_listing()[
+                :POSTS_PER_PAGE
+            ],
+        ),
+        'posts:profile': (
+            Post.objects.filter(author_id=user_id).for_listing()[
+                :POSTS_PER_PAGE
+            ],
+            following_queryset(user_id),
+        ),
+        'posts:post_detail': (
+            Post.objects.select_related(
+                'author__author_profile', 'group'
+            ).filter(pk=post_id),
+            comments.page_queryset(None),
+        ),
+        'posts:follow_index': (
+            feed.get_feed(user).for_listing()[:POSTS_PER_PAGE],
+        ),
+    }
+    first_page = comments.get_page(None)
+    if first_page.has_next():
+        querysets['posts:post_comments'] = (
+            comments.page_queryset(first_page.next_page_number()),
+        )
+    return querysets
+
+
+class Command(BaseCommand):
+    help = 'Печатает EXPLAIN QUERY PLAN для запросов страниц posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'views', nargs='*',
+            help='Имена представлений, например posts:index.'
+        )
+        parser.add_argument('--user', type=int, default=1)
+        parser.add_argument('--group', type=int, default=1)
+        parser.add_argument('--post', type=int, default=1)
+
+    def handle(self, *args, **options):
+        querysets = view_querysets(
+            options['user'], options['group'], options['post']
+        )
+        for view_name, view_querysets_ in querysets.items():
+            if options['views'] and view_name not in options['views']:
+                continue
+            self.stdout.write(self.style.MIGRATE_HEADING(view_name))
+            for queryset in view_querysets_:
+                self.stdout.write(str(queryset.query))
+                self.stdout.write(queryset.explain())
+                self.stdout.write('')
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import (EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_queryset,
+                          iter_export, parse_since)
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты с комментариями в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=EXPORT_FORMATS, default='ndjson'
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.'
+        )
+        parser.add_argument(
+            '--since-id', type=int,
+            help='Только посты с id больше указанного.'
+        )
+        parser.add_argument(
+            '--since', help='Только посты, опубликованные после даты.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=EXPORT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_since(options['since'])
+            if since is None:
+                raise CommandError(f'Неверная дата: {options["since"]}')
+        chunks = iter_export(
+            options['format'],
+            export_queryset(options['since_id'], since),
+            options['chunk_size']
+        )
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            output.writelines(chunks)
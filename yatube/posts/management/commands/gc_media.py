@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from posts.media_gc import GC_BATCH_SIZE, GC_MIN_AGE, MediaCollector
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки, на которые не ссылается ни один пост, '
+            'и устаревшие записи миниатюр sorl.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.'
+        )
+        parser.add_argument('--batch-size', type=int, default=GC_BATCH_SIZE)
+        parser.add_argument(
+            '--min-age', type=int,
+            default=int(GC_MIN_AGE.total_seconds() // 60),
+            help='Не трогать файлы моложе указанного числа минут.'
+        )
+
+    def handle(self, *args, **options):
+        log = None
+        if options['verbosity'] > 1:
+            log = self.stdout.write
+        collector = MediaCollector(
+            batch_size=options['batch_size'],
+            min_age=timedelta(minutes=options['min_age']),
+            dry_run=options['dry_run'],
+            log=log,
+        ).run()
+        verb = 'Найдено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} файлов: {collector.orphans} '
+            f'({collector.freed / 1024 / 1024:.1f} МБ), '
+            f'записей миниатюр: {collector.stale_entries}'
+        ))
@@ -0,0 +1,56 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import EXPORT_FORMATS
+from posts.importer import (IMPORT_BATCH_SIZE, IMPORT_IMAGE_WORKERS,
+                            Importer, read_csv, read_ndjson)
+
+
+class Command(BaseCommand):
+    help = 'Загружает посты, комментарии и подписки из NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл в формате выгрузки.')
+        parser.add_argument(
+            '--format', choices=EXPORT_FORMATS,
+            help='По умолчанию определяется по расширению файла.'
+        )
+        parser.add_argument(
+            '--media-source',
+            help='Каталог, относительно которого лежат картинки постов.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--workers', type=int, default=IMPORT_IMAGE_WORKERS,
+            help='Потоки для копирования картинок.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'Файл не найден: {path}')
+        import_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        reader = read_csv if import_format == 'csv' else read_ndjson
+        importer = Importer(
+            options['media_source'], options['batch_size'],
+            options['workers']
+        )
+        started = time.monotonic()
+
+        def progress(rows):
+            rate = rows / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f'{rows} строк, {rate:.0f} строк/с')
+
+        with open(path, encoding='utf-8', newline='') as stream:
+            rows = importer.run(reader(stream), progress)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {rows} строк за {elapsed:.1f} с '
+            f'({rows / elapsed:.0f} строк/с)'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_posts_count
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов авторов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'authors', nargs='*', type=int,
+            help='id авторов; по умолчанию пересчитываются все.'
+        )
+
+    def handle(self, *args, **options):
+        fixed = reconcile_posts_count(options['authors'] or None)
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено профилей: {fixed}')
+        )
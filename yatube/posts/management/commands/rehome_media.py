@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts.caching import bump_generation
+from posts.images import delete_unreferenced
+from posts.models import Post
+from posts.storage import is_addressed
+
+REHOME_BATCH_SIZE: int = 500
+
+
+def _copy(storage, name):
+    try:
+        with storage.open(name) as source:
+            return name, storage.save(name, source), None
+    except Exception as error:
+        return name, None, f'{name}: {error}'
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки постов из плоского каталога в хранилище '
+            'с адресацией по содержимому.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help='Потоки для хэширования и копирования файлов.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=REHOME_BATCH_SIZE
+        )
+
+    def _batches(self, batch_size):
+        """Имена неперенесённых файлов пачками по ключу image.
+
+        Перенесённые строки получают адресованные имена, поэтому
+        пропускаются и при повторном запуске команды.
+        """
+        last = ''
+        while True:
+            names = list(
+                Post.objects.filter(image__gt=last).order_by(
+                    'image'
+                ).values_list('image', flat=True).distinct()[:batch_size]
+            )
+            if not names:
+                return
+            last = names[-1]
+            yield [name for name in names if not is_addressed(name)]
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        moved = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for batch in self._batches(options['batch_size']):
+                for old, new, error in pool.map(
+                    lambda name: _copy(storage, name), batch
+                ):
+                    if error:
+                        failed += 1
+                        self.stderr.write(error)
+                        continue
+                    Post.objects.filter(image=old).update(image=new)
+                    delete_unreferenced(old)
+                    moved += 1
+        if moved:
+            bump_generation('posts')
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено: {moved}, с ошибками: {failed}'
+        ))
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+def _warm(image):
+    try:
+        generate_thumbnails(image)
+        return None
+    except Exception as error:
+        return f'{image}: {error}'
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Заранее создаёт миниатюры для картинок существующих постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--since-id', type=int, default=0,
+            help='Обрабатывать только посты с id больше указанного.'
+        )
+
+    def handle(self, *args, **options):
+        images = Post.objects.filter(pk__gt=options['since_id']).exclude(
+            image=''
+        ).order_by('pk').values_list('image', flat=True)
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for error in pool.map(_warm, list(images)):
+                if error:
+                    failed += 1
+                    self.stderr.write(error)
+                else:
+                    done += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Готово: {done}, с ошибками: {failed}')
+        )
@@ -0,0 +1,225 @@
+"""Сборка мусора среди картинок постов.
+
+Файлы хранилища и имена из Post.image читаются в одном и том же
+лексикографическом порядке и сравниваются слиянием, поэтому ни одна из
+сторон целиком в память не загружается. Так же по хэшу исходника
+сверяются варианты из posts.variants. Сироты и записи KV-хранилища
+sorl, чьих исходников больше нет, удаляются пачками.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .models import Post
+from .storage import addressed_name, name_digest
+from .variants import VARIANTS_DIR
+
+GC_BATCH_SIZE: int = 500
+GC_MIN_AGE = timedelta(hours=1)
+
+
+def walk_storage(storage, directory):
+    """Имена файлов каталога и подкаталогов в порядке сортировки строк.
+
+    Каталог сортируется как «имя/», чтобы его файлы шли там же, где
+    их полные имена оказались бы при ORDER BY image.
+    """
+    directories, files = storage.listdir(directory)
+    entries = sorted(
+        [(name + '/', name, True) for name in directories]
+        + [(name, name, False) for name in files]
+    )
+    for _, name, is_directory in entries:
+        path = f'{directory}/{name}'
+        if is_directory:
+            yield from walk_storage(storage, path)
+        else:
+            yield path
+
+
+def referenced_images(batch_size=GC_BATCH_SIZE):
+    """Различные непустые Post.image по возрастанию, пачками по ключу."""
+    last = ''
+    while True:
+        names = list(
+            Post.objects.filter(image__gt=last).order_by('image').values_list(
+                'image', flat=True
+            ).distinct()[:batch_size]
+        )
+        if not names:
+            return
+        yield from names
+        last = names[-1]
+
+
+def find_orphans(files, referenced, key=None):
+    """Имена из files, чьих ключей нет в referenced; оба отсортированы.
+
+    key превращает имя файла в значение, сравниваемое с referenced.
+    """
+    referenced = iter(referenced)
+    current = next(referenced, None)
+    for name in files:
+        value = key(name) if key else name
+        while current is not None and current < value:
+            current = next(referenced, None)
+        if current != value:
+            yield name
+
+
+def _variant_digest(name):
+    return name.split('/')[-2]
+
+
+def _batches(names, batch_size):
+    batch = []
+    for name in names:
+        batch.append(name)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class MediaCollector:
+    """Находит и удаляет сирот; с dry_run только считает их."""
+
+    def __init__(self, storage=None, directory='posts',
+                 batch_size=GC_BATCH_SIZE, min_age=GC_MIN_AGE,
+                 dry_run=False, log=None):
+        self.storage = storage or Post._meta.get_field('image').storage
+        self.directory = directory
+        self.batch_size = batch_size
+        self.min_age = min_age
+        self.dry_run = dry_run
+        self.log = log
+        self.orphans = 0
+        self.freed = 0
+        self.stale_entries = 0
+
+    def _is_old_enough(self, name):
+        modified = self.storage.get_modified_time(name)
+        return timezone.now() - modified >= self.min_age
+
+    def _count(self, batch):
+        batch = sorted(name for name in batch if self._is_old_enough(name))
+        self.orphans += len(batch)
+        for name in batch:
+            self.freed += self.storage.size(name)
+            if self.log is not None:
+                self.log(name)
+        return batch
+
+    def _delete_orphans(self, batch):
+        # Одинаковая загрузка могла сослаться на файл после того, как
+        # слияние прошло его имя.
+        batch = set(batch) - set(
+            Post.objects.filter(image__in=batch).values_list(
+                'image', flat=True
+            )
+        )
+        batch = self._count(batch)
+        if self.dry_run:
+            return
+        with transaction.atomic():
+            for name in batch:
+                default.kvstore.delete(ImageFile(name, self.storage))
+        for name in batch:
+            self.storage.delete(name)
+
+    def collect_files(self):
+        if not self.storage.exists(self.directory):
+            return
+        orphans = find_orphans(
+            walk_storage(self.storage, self.directory),
+            referenced_images(self.batch_size)
+        )
+        for batch in _batches(orphans, self.batch_size):
+            self._delete_orphans(batch)
+
+    def _delete_variants(self, batch):
+        digests = {_variant_digest(name) for name in batch}
+        lookup = Q()
+        for digest in digests:
+            prefix = addressed_name(f'{self.directory}/', digest)
+            lookup |= Q(image__startswith=f'{prefix}.')
+        referenced = {
+            name_digest(name) for name in Post.objects.filter(
+                lookup
+            ).values_list('image', flat=True)
+        }
+        batch = self._count(
+            name for name in batch
+            if _variant_digest(name) not in referenced
+        )
+        if not self.dry_run:
+            for name in batch:
+                self.storage.delete(name)
+
+    def collect_variants(self):
+        """Удаляет варианты картинок, которые больше не нужны ни одному
+        посту."""
+        if not self.storage.exists(VARIANTS_DIR):
+            return
+        digests = filter(None, map(
+            name_digest, referenced_images(self.batch_size)
+        ))
+        orphans = find_orphans(
+            walk_storage(self.storage, VARIANTS_DIR), digests,
+            key=_variant_digest
+        )
+        for batch in _batches(orphans, self.batch_size):
+            self._delete_variants(batch)
+
+    def _stale_images(self, values):
+        sources = {}
+        for value in values:
+            image_file = deserialize_image_file(value)
+            if image_file.name.startswith(self.directory + '/'):
+                sources[image_file.name] = image_file
+        referenced = set(
+            Post.objects.filter(image__in=list(sources)).values_list(
+                'image', flat=True
+            )
+        )
+        return [
+            image_file for name, image_file in sorted(sources.items())
+            if name not in referenced and not image_file.exists()
+        ]
+
+    def collect_kvstore(self):
+        """Удаляет записи sorl об исходниках, которых нет ни в постах,
+        ни в хранилище, вместе с их миниатюрами."""
+        prefix = add_prefix('')
+        last = prefix
+        while True:
+            rows = list(
+                KVStoreModel.objects.filter(
+                    key__startswith=prefix, key__gt=last
+                ).order_by('key').values_list('key', 'value')[
+                    :self.batch_size
+                ]
+            )
+            if not rows:
+                return
+            last = rows[-1][0]
+            stale = self._stale_images(value for _, value in rows)
+            self.stale_entries += len(stale)
+            if self.dry_run or not stale:
+                continue
+            with transaction.atomic():
+                for image_file in stale:
+                    default.kvstore.delete(image_file)
+
+    def run(self):
+        self.collect_files()
+        self.collect_variants()
+        self.collect_kvstore()
+        return self
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def create_author_profiles(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    AuthorProfile = apps.get_model('posts', 'AuthorProfile')
+    totals = dict(
+        Post.objects.order_by().values('author').annotate(
+            total=Count('pk')
+        ).values_list('author', 'total')
+    )
+    AuthorProfile.objects.bulk_create(
+        [
+            AuthorProfile(user_id=user_id, posts_count=totals.get(user_id, 0))
+            for user_id in User.objects.values_list('pk', flat=True)
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0020_indexes_and_unique_follow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorProfile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='author_profile', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Всего постов')),
+            ],
+            options={
+                'verbose_name': 'Профиль автора',
+                'verbose_name_plural': 'Профили авторов',
+            },
+        ),
+        migrations.RunPython(
+            create_author_profiles, migrations.RunPython.noop
+        ),
+    ]
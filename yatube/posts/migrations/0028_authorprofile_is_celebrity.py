@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0027_post_image_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorprofile',
+            name='is_celebrity',
+            field=models.BooleanField(default=False, help_text='Посты не раздаются по лентам, см. posts.feed', verbose_name='Знаменитость'),
+        ),
+    ]
@@ -1,8 +1,12 @@
 from django.db import models
 from django.contrib.auth import get_user_model
-from django.db.models import SET_NULL
+from django.db.models import (SET_NULL, Count, IntegerField, OuterRef,
+                              Subquery)
+from django.db.models.functions import Coalesce
 from django.utils.text import Truncator
 
+from .storage import ContentAddressedStorage
+
 MAX_LEN_TEXT = 3
 User = get_user_model()
 
@@ -17,6 +21,22 @@ class Group(models.Model):
         return Truncator(self.title).words(MAX_LEN_TEXT)
 
 
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Посты для ленты: автор и группа одним JOIN, число комментариев
+        коррелированным подзапросом только для строк страницы."""
+        comments = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(
+            total=Count('pk')
+        ).values('total')
+        return self.select_related('author', 'group').annotate(
+            comment_count=Coalesce(
+                Subquery(comments, output_field=IntegerField()), 0
+            )
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         help_text='Текст нового поста'
@@ -42,13 +62,46 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, blank=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', null=True, blank=True, editable=False
+    )
+    image_variants = models.TextField(
+        'Варианты картинки', blank=True, default='', editable=False,
+        help_text='JSON-описание вариантов из posts.variants'
+    )
+    image_placeholder = models.TextField(
+        'Заглушка картинки', blank=True, default='', editable=False,
+        help_text='data URI крошечной копии для карточки'
+    )
+    image_color = models.CharField(
+        'Основной цвет картинки', max_length=7, blank=True, default='',
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = (
+            models.Index(fields=('-pub_date',), name='post_pub_date_idx'),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date'),
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(fields=('image',), name='post_image_idx'),
+        )
 
     def __str__(self):
         return Truncator(self.text).words(MAX_LEN_TEXT)
@@ -70,6 +123,13 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('post', 'created'), name='comment_post_created_idx'
+            ),
+        )
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -82,3 +142,66 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name="following"
     )
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'user'), name='follow_author_user_idx'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+        )
+
+
+class FeedEntry(models.Model):
+    """Материализованная лента подписок: одна строка на пост у читателя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date'), name='feed_user_pub_date_idx'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_feed_entry'
+            ),
+        )
+
+
+class AuthorProfile(models.Model):
+    """Денормализованные счётчики автора, чтобы не считать посты в шаблонах.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='author_profile'
+    )
+    posts_count = models.PositiveIntegerField('Всего постов', default=0)
+    is_celebrity = models.BooleanField(
+        'Знаменитость', default=False,
+        help_text='Посты не раздаются по лентам, см. posts.feed'
+    )
+
+    class Meta:
+        verbose_name = 'Профиль автора'
+        verbose_name_plural = 'Профили авторов'
+
+    def __str__(self):
+        return str(self.user)
@@ -0,0 +1,126 @@
+"""Полнотекстовый поиск по Post.text на виртуальной таблице SQLite FTS5.
+
+posts_post_fts — external content таблица над posts_post: текст хранится
+только в posts_post, а индекс поддерживают триггеры, поэтому он видит и
+bulk_create, и правки через admin. Перестройка таблицы posts_post
+(ALTER в SQLite делается копированием) удаляет триггеры — после каждого
+migrate ensure_index возвращает их и перестраивает индекс.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+SEARCH_ORDERING = ('rank', '-id')
+SEARCH_MAX_TERMS: int = 8
+
+FTS_TRIGGERS = {
+    f'{FTS_TABLE}_ai': (
+        f'AFTER INSERT ON posts_post BEGIN '
+        f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); '
+        f'END'
+    ),
+    f'{FTS_TABLE}_ad': (
+        f'AFTER DELETE ON posts_post BEGIN '
+        f'INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) '
+        f"VALUES ('delete', old.id, old.text); "
+        f'END'
+    ),
+    f'{FTS_TABLE}_au': (
+        f'AFTER UPDATE OF text ON posts_post BEGIN '
+        f'INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) '
+        f"VALUES ('delete', old.id, old.text); "
+        f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); '
+        f'END'
+    ),
+}
+
+_TERM_RE = re.compile(r'\w+')
+
+
+def is_available(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def ensure_index(using='default'):
+    """Возвращает потерянные триггеры и перестраивает индекс.
+
+    Саму таблицу создаёт миграция 0022; True — если триггеры пришлось
+    восстанавливать.
+    """
+    connection = connections[using]
+    if not is_available(using):
+        return False
+    if Post._meta.db_table not in connection.introspection.table_names():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+            " AND name LIKE %s",
+            [f'{FTS_TABLE}%']
+        )
+        existing = {name for name, in cursor.fetchall()}
+        missing = [name for name in FTS_TRIGGERS if name not in existing]
+        if FTS_TABLE not in existing or not missing:
+            return False
+        for name in missing:
+            cursor.execute(f'CREATE TRIGGER {name} {FTS_TRIGGERS[name]}')
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+    return True
+
+
+def build_match(query):
+    """Запрос пользователя в выражение MATCH: слова в кавычках, по
+    префиксу, все обязательны. Синтаксис FTS5 из ввода не пропускается."""
+    terms = _TERM_RE.findall(query or '')[:SEARCH_MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+class _Subselect(RawSQL):
+    """RawSQL без собственных скобок: иначе SQLite читает
+    IN ((SELECT ...)) как скаляр и берёт только первую строку."""
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def matching_ids(match):
+    return _Subselect(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (match,)
+    )
+
+
+def search_posts(query, queryset=None):
+    """Посты, подходящие под запрос, с релевантностью bm25 в поле rank.
+
+    Чем меньше rank, тем выше пост в выдаче; без FTS5 — поиск по
+    вхождению с нулевым rank. Индекс присоединяется к posts_post один раз
+    по rowid, и rank читается из той же выборки MATCH: подзапрос на
+    каждую строку повторял бы MATCH для каждого совпадения.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    match = build_match(query)
+    if not match:
+        return queryset.none()
+    if not is_available(queryset.db):
+        return queryset.filter(text__icontains=query).annotate(
+            rank=RawSQL('0.0', (), output_field=FloatField())
+        )
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = {Post._meta.db_table}.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[match]
+    ).annotate(
+        rank=RawSQL(f'{FTS_TABLE}.rank', (), output_field=FloatField())
+    )
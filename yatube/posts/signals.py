@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import feed, search
+from .caching import bump_generation
+from .counters import change_posts_count, reset_comment_count
+from .follow_graph import invalidate_following
+from .models import AuthorProfile, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def create_author_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorProfile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        feed.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def increment_posts_count(sender, instance, created, **kwargs):
+    if created:
+        change_posts_count(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def decrement_posts_count(sender, instance, **kwargs):
+    change_posts_count(instance.author_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(sender, instance, **kwargs):
+    feed.prune(instance.user_id, instance.author_id)
+
+
+# Кэш сбрасывается после фиксации: иначе читатель между сбросом и
+# COMMIT закэширует старый снимок под новым поколением.
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    scope = f'post:{instance.pk}'
+    transaction.on_commit(lambda: bump_generation('posts', scope))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    post_id = instance.post_id
+
+    def invalidate():
+        reset_comment_count(post_id)
+        bump_generation('comments', f'post:{post_id}')
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    user_id = instance.user_id
+
+    def invalidate():
+        invalidate_following(user_id)
+        bump_generation('follows')
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_generation('groups'))
+
+
+@receiver(post_migrate)
+def ensure_search_index(sender, using, **kwargs):
+    if sender.name == 'posts':
+        search.ensure_index(using)
@@ -0,0 +1,100 @@
+"""Хранилище картинок постов с адресацией по содержимому.
+
+Файл называется по SHA-256 содержимого и кладётся в подкаталоги по
+первым символам хэша: posts/ab/cd/abcd….jpg. Каталоги остаются
+небольшими, а одинаковые загрузки превращаются в ссылки на один файл —
+поэтому удалять файл можно, только если на него больше никто не ссылается.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_ALGORITHM = 'sha256'
+HASH_CHUNK_SIZE: int = 64 * 1024
+SHARD_DEPTH: int = 2
+SHARD_WIDTH: int = 2
+
+_ADDRESSED_NAME = re.compile(
+    r'(?:^|/)' + r'[0-9a-f]{%d}/' % SHARD_WIDTH * SHARD_DEPTH
+    + r'[0-9a-f]{64}(?:\.\w+)?$'
+)
+
+
+def content_hash(content):
+    """Хэш файла; позиция чтения возвращается в начало."""
+    digest = hashlib.new(HASH_ALGORITHM)
+    content.seek(0)
+    for chunk in iter(lambda: content.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def addressed_name(name, digest):
+    """posts/x.JPG и хэш abcd… → posts/ab/cd/abcd….jpg.
+
+    Для уже адресованного имени каталоги шардов не вкладываются повторно.
+    """
+    directory = os.path.dirname(name)
+    if is_addressed(name):
+        directory = '/'.join(directory.split('/')[:-SHARD_DEPTH])
+    extension = os.path.splitext(name)[1].lower()
+    shards = [
+        digest[index * SHARD_WIDTH:(index + 1) * SHARD_WIDTH]
+        for index in range(SHARD_DEPTH)
+    ]
+    return '/'.join(
+        filter(None, (directory, *shards, digest + extension))
+    )
+
+
+def is_addressed(name):
+    return bool(_ADDRESSED_NAME.search(name))
+
+
+def name_digest(name):
+    """Хэш содержимого из адресованного имени; None для прочих имён."""
+    if not is_addressed(name):
+        return None
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, который сам выбирает имя по содержимому файла.
+
+    Если такой файл уже есть, он не перезаписывается: save() сразу
+    возвращает имя существующего файла. Между exists() и записью файл
+    может положить параллельный запрос — тогда имя тоже не меняется:
+    содержимое по этому адресу то же самое, и его перезапись безопасна.
+    """
+
+    # Без O_EXCL: повторная запись того же содержимого поверх файла,
+    # а не поиск «свободного» имени с суффиксом.
+    OS_OPEN_FLAGS = FileSystemStorage.OS_OPEN_FLAGS & ~os.O_EXCL
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = addressed_name(
+            self.generate_filename(name), content_hash(content)
+        )
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+    def _save(self, name, content):
+        if hasattr(content, 'temporary_file_path'):
+            # file_move_safe() не пишет поверх существующего файла, и
+            # повтор с тем же именем зациклился бы: копируем потоком.
+            content = File(content.file, content.name)
+        return super()._save(name, content)
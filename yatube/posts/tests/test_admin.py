@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_superuser(
+            username='staff', email='staff@example.com', password='pass'
+        )
+        cls.user = User.objects.create_user(username='auth')
+        Group.objects.bulk_create([
+            Group(title=f'Группа {i}', slug=f'group_{i}', description='')
+            for i in range(5)
+        ])
+        cls.group = Group.objects.first()
+        Follow.objects.create(user=cls.user, author=cls.staff)
+        cls.url_posts = reverse('admin:posts_post_changelist')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def count_changelist_queries(self, posts_count):
+        Post.objects.all().delete()
+        Post.objects.bulk_create([
+            Post(author=self.user, group=self.group, text=f'Пост {i}')
+            for i in range(posts_count)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url_posts)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_post_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов changelist не зависит от числа строк."""
+        self.assertEqual(
+            self.count_changelist_queries(2),
+            self.count_changelist_queries(20)
+        )
+
+    def test_unfiltered_count_is_estimated(self):
+        """Без фильтров число строк оценивается по последнему id."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Пост {i}') for i in range(3)
+        ])
+        Post.objects.order_by('pk').first().delete()
+        response = self.client.get(self.url_posts)
+        self.assertEqual(
+            response.context['cl'].result_count,
+            Post.objects.order_by('-pk').first().pk
+        )
+        response = self.client.get(
+            self.url_posts, {'author__id__exact': self.user.pk}
+        )
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_follow_search_by_username(self):
+        """Подписки ищутся по имени подписчика и автора."""
+        response = self.client.get(
+            reverse('admin:posts_follow_changelist'), {'q': 'auth'}
+        )
+        self.assertEqual(len(response.context['cl'].result_list), 1)
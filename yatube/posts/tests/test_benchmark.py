@@ -0,0 +1,77 @@
+import random
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import benchmark
+from ..urls import urlpatterns
+from ..models import Follow, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        benchmark.seed_database(
+            users=5, groups=2, posts=30, comments=1, follows=2
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_is_reproducible_and_complete(self):
+        """Данные генерируются детерминированно и загружаются целиком."""
+        now = timezone.now()
+        first = list(benchmark.generate_records(users=3, posts=5, now=now))
+        second = list(benchmark.generate_records(users=3, posts=5, now=now))
+        self.assertEqual(first, second)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertTrue(Follow.objects.exists())
+        self.assertEqual(Post.objects.exclude(image='').count(), 3)
+
+    def test_run_reports_every_route(self):
+        """Отчёт содержит задержки и число запросов по каждому маршруту."""
+        report = benchmark.run(requests=2, warmup=0)
+        self.assertEqual(
+            set(report['routes']),
+            {pattern.name for pattern in urlpatterns}
+        )
+        index = report['routes']['index']
+        self.assertEqual(index['requests'], 2)
+        self.assertGreater(index['queries']['max'], 0)
+        self.assertIn('p95', index['latency_ms'])
+
+    def test_comments_scenario_follows_cursor(self):
+        """Фрагмент комментариев запрашивается с рабочим курсором."""
+        fixtures = benchmark.Fixtures(random.Random(benchmark.BENCHMARK_SEED))
+        url, data = fixtures.comments_fragment()
+        response = self.client.get(url, data)
+        comments = response.context['comments']
+        self.assertTrue(comments.has_previous())
+        self.assertGreater(len(comments), 0)
+
+    def test_compare_flags_regressions_above_threshold(self):
+        """Рост сверх порога попадает в список регрессий."""
+        baseline = {'routes': {'index': {
+            'latency_ms': {'p95': 10.0}, 'queries': {'p50': 4},
+        }}}
+        report = {'routes': {'index': {
+            'latency_ms': {'p95': 11.0}, 'queries': {'p50': 6},
+        }}}
+        self.assertEqual(
+            benchmark.compare(report, baseline, threshold=0.2),
+            ['index queries.p50: 4 → 6']
+        )
+        self.assertEqual(benchmark.compare(report, report), [])
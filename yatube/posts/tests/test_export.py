@@ -0,0 +1,194 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import (AuthorProfile, Comment, FeedEntry, Follow, Group,
+                      Post)
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='Test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Первый пост', group=cls.group
+        )
+        cls.new_post = Post.objects.create(author=cls.user, text='Второй')
+        Comment.objects.create(
+            post=cls.post, author=cls.staff, text='Комментарий'
+        )
+        cls.url_export = reverse('posts:export_posts')
+
+    def test_export_is_staff_only(self):
+        """Выгрузка недоступна обычному пользователю."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(self.url_export)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_export_streams_ndjson_with_comments(self):
+        """Сотрудник получает посты с комментариями построчно в NDJSON."""
+        client = Client()
+        client.force_login(self.staff)
+        response = client.get(self.url_export)
+        self.assertTrue(response.streaming)
+        records = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [record['id'] for record in records],
+            [self.post.pk, self.new_post.pk]
+        )
+        self.assertEqual(records[0]['group'], self.group.slug)
+        self.assertEqual(records[0]['comments'][0]['author'], 'staff')
+
+    def test_export_command_is_incremental(self):
+        """--since-id выгружает только более новые посты."""
+        output = StringIO()
+        call_command(
+            'export_posts', '--format', 'csv',
+            '--since-id', str(self.post.pk), stdout=output
+        )
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f'{self.new_post.pk},'))
+
+    def test_impossible_since_date_is_rejected(self):
+        """Несуществующая дата в since — ошибка запроса, а не 500."""
+        client = Client()
+        client.force_login(self.staff)
+        for since in ('2024-02-30', '2024-02-30T10:00:00', 'вчера'):
+            with self.subTest(since=since):
+                response = client.get(self.url_export, {'since': since})
+                self.assertEqual(
+                    response.status_code, HTTPStatus.BAD_REQUEST
+                )
+        with self.assertRaises(CommandError):
+            call_command(
+                'export_posts', '--since', '2024-02-30', stdout=StringIO()
+            )
+
+    def test_import_round_trip(self):
+        """Выгрузка загружается обратно с датами, комментариями и лентой."""
+        output = StringIO()
+        call_command('export_posts', stdout=output)
+        records = output.getvalue().replace(
+            '"auth"', '"imported"'
+        ).replace('"Test_slug"', '"new_slug"')
+        records += json.dumps(
+            {'type': 'follow', 'user': 'staff', 'author': 'imported'}
+        ) + '\n'
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.ndjson')
+            with open(path, 'w', encoding='utf-8') as stream:
+                stream.write(records)
+            call_command(
+                'import_posts', path, '--batch-size', '1', stdout=StringIO()
+            )
+        author = User.objects.get(username='imported')
+        imported = Post.objects.filter(author=author).order_by('pk')
+        for post, source in zip(imported, (self.post, self.new_post)):
+            with self.subTest(text=source.text):
+                self.assertEqual(post.text, source.text)
+                self.assertAlmostEqual(
+                    post.pub_date, source.pub_date,
+                    delta=timedelta(milliseconds=1)
+                )
+        self.assertEqual(imported[0].group.slug, 'new_slug')
+        self.assertEqual(imported[0].comments.get().author, self.staff)
+        self.assertEqual(
+            AuthorProfile.objects.get(user=author).posts_count, 2
+        )
+        self.assertTrue(
+            Follow.objects.filter(user=self.staff, author=author).exists()
+        )
+        self.assertEqual(
+            self.staff.feed_entries.filter(post__author=author).count(), 2
+        )
+
+    def test_import_creates_profiles_and_never_reuses_ids(self):
+        """Новые пользователи получают профили, а посты и комментарии —
+        id, которых не было даже у удалённых строк."""
+        deleted = Post.objects.create(author=self.user, text='Удалённый')
+        deleted_comment = Comment.objects.create(
+            post=deleted, author=self.user, text='Удалённый'
+        )
+        deleted_ids = (deleted.pk, deleted_comment.pk)
+        deleted.delete()
+        records = [
+            {
+                'text': 'Импорт', 'author': 'writer', 'group': None,
+                'comments': [{'author': 'reader', 'text': 'Ответ'}],
+            },
+            {'type': 'follow', 'user': 'follower', 'author': 'writer'},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.ndjson')
+            with open(path, 'w', encoding='utf-8') as stream:
+                stream.writelines(
+                    json.dumps(record) + '\n' for record in records
+                )
+            call_command('import_posts', path, stdout=StringIO())
+        for username in ('writer', 'reader', 'follower'):
+            with self.subTest(username=username):
+                self.assertTrue(AuthorProfile.objects.filter(
+                    user__username=username
+                ).exists())
+        imported = Post.objects.get(text='Импорт')
+        self.assertGreater(imported.pk, deleted_ids[0])
+        self.assertGreater(imported.comments.get().pk, deleted_ids[1])
+        created = Post.objects.create(author=self.user, text='После импорта')
+        self.assertGreater(created.pk, imported.pk)
+
+    def test_import_backfills_feeds_in_batches(self):
+        """Ленты подписчиков импортированного автора заполняются пачками,
+        а не запросом на каждую подписку."""
+        author = User.objects.create_user(username='popular')
+        User.objects.bulk_create(
+            User(username=f'reader{i}') for i in range(30)
+        )
+        readers = User.objects.filter(username__startswith='reader')
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author) for reader in readers
+        )
+        records = [
+            {'text': f'Пост {i}', 'author': 'popular', 'group': None,
+             'comments': []}
+            for i in range(2)
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.ndjson')
+            with open(path, 'w', encoding='utf-8') as stream:
+                stream.writelines(
+                    json.dumps(record) + '\n' for record in records
+                )
+            with CaptureQueriesContext(connection) as queries:
+                call_command('import_posts', path, stdout=StringIO())
+        feed_inserts = [
+            query for query in queries
+            if 'INTO "posts_feedentry"' in query['sql']
+        ]
+        self.assertEqual(len(feed_inserts), 1)
+        self.assertEqual(
+            FeedEntry.objects.filter(post__author=author).count(), 60
+        )
@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .. import feed
+from ..follow_graph import get_following_ids, is_following
+from ..models import FeedEntry, Follow, Post
+from .utils import run_on_commit_callbacks
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Старый пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка добавляет старые посты в ленту, отписка убирает их."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(
+            list(feed.get_feed(self.reader)), [new_post, self.old_post]
+        )
+        follow.delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertFalse(feed.get_feed(self.reader).exists())
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=1)
+    def test_celebrity_posts_are_read_on_demand(self):
+        """Посты знаменитостей не раздаются, но попадают в ленту."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        cache.clear()
+        post = Post.objects.create(author=self.author, text='Пост звезды')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertIn(post, feed.get_feed(self.reader))
+
+    def test_former_celebrity_posts_stay_in_feed(self):
+        """Пост, написанный знаменитостью, остаётся в ленте и после того,
+        как автор выходит из множества знаменитостей."""
+        with self.settings(FEED_CELEBRITY_FOLLOWERS=1):
+            Follow.objects.create(user=self.reader, author=self.author)
+            cache.clear()
+            post = Post.objects.create(author=self.author, text='Пост звезды')
+            self.assertIn(post, feed.get_feed(self.reader))
+        cache.clear()
+        self.assertIn(post, feed.get_feed(self.reader))
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_membership_is_served_from_cache(self):
+        """Повторная проверка подписки не ходит в базу."""
+        self.assertFalse(is_following(self.reader, self.author.pk))
+        with self.assertNumQueries(0):
+            self.assertFalse(is_following(self.reader, self.author.pk))
+
+    def test_follow_and_unfollow_update_the_set(self):
+        """Подписка и отписка через представления меняют множество."""
+        self.client.force_login(self.reader)
+        self.assertEqual(get_following_ids(self.reader), frozenset())
+        self.client.get(f'/profile/{self.author.username}/follow/')
+        self.assertEqual(get_following_ids(self.reader), frozenset())
+        run_on_commit_callbacks()
+        self.assertEqual(
+            get_following_ids(self.reader), frozenset({self.author.pk})
+        )
+        self.client.get(f'/profile/{self.author.username}/unfollow/')
+        run_on_commit_callbacks()
+        self.assertFalse(is_following(self.reader, self.author.pk))
+
+    def test_anonymous_user_skips_database(self):
+        """Для анонима проверка подписки не делает запросов."""
+        with self.assertNumQueries(0):
+            self.assertFalse(is_following(AnonymousUser(), self.author.pk))
@@ -4,17 +4,29 @@ import tempfile
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.db.models.signals import post_save
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from ..forms import PostForm
 from ..models import Comment, Post, Group
+from .utils import run_on_commit_callbacks
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 User = get_user_model()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_PROCESSING_INLINE=True)
 class TaskCreateFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -79,9 +91,10 @@ class TaskCreateFormTests(TestCase):
                 author=self.user,
                 text='Непохожий на меня, непохожий на тебя',
                 group=self.group.id,
-                image='posts/small.gif'
+                image__regex=r'^posts/\w\w/\w\w/\w{64}\.gif$'
             ).exists()
         )
+        run_on_commit_callbacks()
         response_group = self.authorized_client.get(
             reverse('posts:group_list', kwargs={'slug': 'Test_slug'})
         )
@@ -90,6 +103,38 @@ class TaskCreateFormTests(TestCase):
             first_object.text, 'Непохожий на меня, непохожий на тебя'
         )
 
+    def test_create_post_retries_locked_write_with_upload(self):
+        """Повтор после «database is locked» сохраняет пост с картинкой:
+        форма и загруженный файл не читаются второй раз."""
+        attempts = []
+
+        def locked_once(sender, instance, **kwargs):
+            attempts.append(instance)
+            if len(attempts) == 1:
+                raise OperationalError('database is locked')
+
+        post_save.connect(locked_once, sender=Post)
+        try:
+            response = self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={
+                    'text': 'Пост после блокировки',
+                    'image': SimpleUploadedFile(
+                        name='locked.gif',
+                        content=SMALL_GIF.replace(b'\xFF', b'\xFE'),
+                        content_type='image/gif'
+                    ),
+                },
+            )
+        finally:
+            post_save.disconnect(locked_once, sender=Post)
+        self.assertRedirects(
+            response, reverse('posts:profile', args=(self.user.username,))
+        )
+        self.assertEqual(len(attempts), 2)
+        post = Post.objects.get(text='Пост после блокировки')
+        self.assertTrue(post.image.storage.exists(post.image.name))
+
     def test_post_edit_if_valid_form(self):
         """Проверяем, что пост редактируется через форму."""
         form_fields = {
@@ -111,6 +156,25 @@ class TaskCreateFormTests(TestCase):
             ).exists()
         )
 
+    def test_post_edit_keeps_columns_outside_form(self):
+        """Редактирование без новой картинки не перезаписывает описание
+        вариантов, записанное фоновой обработкой."""
+        Post.objects.filter(pk=self.post.pk).update(image_variants='[]')
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client_author.post(
+                reverse('posts:post_edit', args=(self.post.pk,)),
+                data={'text': 'Правка', 'group': self.group.pk}
+            )
+        update, = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ]
+        self.assertNotIn('image_variants', update)
+        self.assertNotIn('author_id', update)
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).image_variants, '[]'
+        )
+
     def test_auth_user_can_edit_post(self):
         """Проверяем, что пост появился на всех страницах."""
         urls = (reverse('posts:index'),
@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..counters import reconcile_posts_count
+from ..models import AuthorProfile, Follow, Group, Post
 
 User = get_user_model()
 
@@ -55,3 +57,25 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     post._meta.get_field(field).verbose_name, expected_value
                 )
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на того же автора запрещена на уровне БД."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=reader, author=self.user)
+
+    def test_posts_count_follows_creates_and_deletes(self):
+        """Счётчик постов автора меняется при создании и удалении постов."""
+        author = User.objects.create_user(username='counter')
+        posts = [
+            Post.objects.create(author=author, text='Пост') for _ in range(3)
+        ]
+        posts[0].delete()
+        profile = AuthorProfile.objects.get(user=author)
+        self.assertEqual(profile.posts_count, 2)
+        Post.objects.bulk_create([Post(author=author, text='Массовый')])
+        AuthorProfile.objects.filter(user=author).update(posts_count=0)
+        self.assertEqual(reconcile_posts_count([author.pk]), 1)
+        profile.refresh_from_db()
+        self.assertEqual(profile.posts_count, 3)
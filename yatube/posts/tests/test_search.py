@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import (FTS_TABLE, SEARCH_ORDERING, build_match, ensure_index,
+                      search_posts)
+from ..utils import POSTS_PER_PAGE
+
+User = get_user_model()
+POSTS_COUNT = 15
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.staff = User.objects.create_superuser(
+            username='staff', email='staff@example.com', password='pass'
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.user, text=f'Заметка про котов номер {i}')
+            for i in range(POSTS_COUNT)
+        ])
+        cls.relevant = Post.objects.create(
+            author=cls.user, text='Коты, коты и ещё раз коты'
+        )
+        cls.other = Post.objects.create(author=cls.user, text='Про собак')
+        cls.url_search = reverse('posts:search')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_build_match_quotes_terms(self):
+        """Синтаксис FTS5 из запроса экранируется."""
+        self.assertEqual(
+            build_match('кот "OR" NEAR(*'), '"кот"* "OR"* "NEAR"*'
+        )
+        self.assertEqual(build_match('  ***  '), '')
+
+    def test_search_is_ranked_and_case_insensitive(self):
+        """Совпадения ранжируются bm25, регистр не важен."""
+        found = list(
+            search_posts('КОТЫ').order_by('rank', '-id').values_list(
+                'pk', flat=True
+            )
+        )
+        self.assertEqual(found[0], self.relevant.pk)
+        self.assertNotIn(self.other.pk, found)
+        self.assertFalse(search_posts('').exists())
+
+    def test_rank_is_read_from_a_single_match(self):
+        """Индекс присоединяется один раз по rowid: MATCH не повторяется
+        подзапросом для каждого найденного поста."""
+        plan = search_posts('кот').order_by(*SEARCH_ORDERING).explain()
+        self.assertEqual(plan.count(FTS_TABLE), 1)
+        self.assertNotIn('CORRELATED', plan)
+        self.assertIn('posts_post USING INTEGER PRIMARY KEY', plan)
+
+    def test_index_follows_edits_and_deletes(self):
+        """Триггеры обновляют индекс при правке и удалении поста."""
+        self.other.text = 'Теперь про хомяков'
+        self.other.save()
+        self.assertFalse(search_posts('собак').exists())
+        self.assertTrue(search_posts('хомяков').filter(
+            pk=self.other.pk
+        ).exists())
+        self.other.delete()
+        self.assertFalse(search_posts('хомяков').exists())
+
+    def test_ensure_index_restores_lost_triggers(self):
+        """Потерянные после перестройки таблицы триггеры возвращаются."""
+        self.assertFalse(ensure_index())
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_fts_ai')
+        self.assertTrue(ensure_index())
+        post = Post.objects.create(author=self.user, text='Про попугаев')
+        self.assertEqual(list(search_posts('попугаев')), [post])
+
+    def test_search_view_pages_with_cursor(self):
+        """Страницы выдачи идут по курсору и сохраняют запрос."""
+        response = self.client.get(self.url_search, {'q': 'кот'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), POSTS_PER_PAGE)
+        self.assertEqual(page_obj[0], self.relevant)
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82&amp;page=')
+        response = self.client.get(
+            self.url_search,
+            {'q': 'кот', 'page': page_obj.next_page_number()}
+        )
+        rest = response.context['page_obj']
+        self.assertEqual(len(rest), POSTS_COUNT + 1 - POSTS_PER_PAGE)
+        self.assertFalse(set(rest) & set(page_obj))
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке находит посты через FTS."""
+        client = Client()
+        client.force_login(self.staff)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собак'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.other]
+        )
@@ -0,0 +1,272 @@
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import (SimpleUploadedFile,
+                                            TemporaryUploadedFile)
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from ..images import ingest_image
+from ..media_gc import find_orphans, walk_storage
+from ..models import Post
+from ..storage import ContentAddressedStorage, is_addressed
+from ..thumbnails import generate_thumbnails
+from ..variants import VARIANT_FORMATS, VARIANT_WIDTHS, generate_variants
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name=name, content=SMALL_GIF, content_type='image/gif'
+            )
+        )
+
+    def test_duplicate_uploads_share_sharded_file(self):
+        """Одинаковые загрузки ссылаются на один файл в подкаталогах."""
+        first = self.create_post('first.GIF')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_addressed(first.image.name))
+        self.assertRegex(
+            first.image.name, r'^posts/(\w\w)/(\w\w)/\1\2\w{60}\.gif$'
+        )
+
+    def test_concurrent_save_keeps_addressed_name(self):
+        """Файл, появившийся между exists() и записью, не даёт имени
+        с суффиксом: одинаковое содержимое ложится по тому же адресу."""
+
+        class RacingStorage(ContentAddressedStorage):
+            raced = False
+
+            def exists(self, name):
+                if self.raced:
+                    return super().exists(name)
+                self.raced = True
+                return False
+
+        name = ContentAddressedStorage().save(
+            'posts/first.gif', ContentFile(SMALL_GIF)
+        )
+        upload = TemporaryUploadedFile('third.gif', 'image/gif', 0, None)
+        upload.write(SMALL_GIF)
+        for content in (ContentFile(SMALL_GIF), upload):
+            with self.subTest(content=type(content).__name__):
+                self.assertEqual(
+                    RacingStorage().save('posts/x.gif', content), name
+                )
+        upload.close()
+        storage = ContentAddressedStorage()
+        with storage.open(name) as stored:
+            self.assertEqual(stored.read(), SMALL_GIF)
+        self.assertEqual(storage.listdir(os.path.dirname(name))[1], [
+            os.path.basename(name)
+        ])
+
+    def test_ingest_keeps_original_shared_with_other_post(self):
+        """Приём картинки не удаляет оригинал, нужный другому посту."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        self.assertTrue(ingest_image(first.pk))
+        self.assertTrue(second.image.storage.exists(second.image.name))
+        self.assertTrue(ingest_image(second.pk))
+        self.assertFalse(second.image.storage.exists(second.image.name))
+
+    def test_rehome_media_moves_and_deduplicates(self):
+        """rehome_media переносит плоские файлы и склеивает дубликаты."""
+        flat = FileSystemStorage()
+        names = [
+            flat.save(f'posts/flat{index}.gif', ContentFile(SMALL_GIF))
+            for index in range(2)
+        ]
+        for name in names:
+            post = self.create_post('new.gif')
+            Post.objects.filter(pk=post.pk).update(image=name)
+        call_command('rehome_media', '--batch-size', '1', stdout=StringIO())
+        images = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(images), 1)
+        self.assertTrue(is_addressed(images.pop()))
+        for name in names:
+            self.assertFalse(flat.exists(name))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaGarbageCollectorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_walk_matches_database_ordering(self):
+        """Обход хранилища идёт в порядке сортировки полных имён."""
+        storage = FileSystemStorage()
+        names = ['walk/ab.gif', 'walk/ab/c.gif', 'walk/a-b.gif']
+        for name in names:
+            storage.save(name, ContentFile(SMALL_GIF))
+        self.assertEqual(list(walk_storage(storage, 'walk')), sorted(names))
+        self.assertEqual(
+            list(find_orphans(sorted(names), ['walk/ab.gif'])),
+            ['walk/a-b.gif', 'walk/ab/c.gif']
+        )
+
+    def test_gc_media_deletes_orphans_and_thumbnail_entries(self):
+        """gc_media удаляет файл удалённого поста и записи его миниатюр."""
+        kept, removed = (
+            Post.objects.create(
+                author=self.user,
+                text='Пост с картинкой',
+                image=SimpleUploadedFile(
+                    name='image.gif',
+                    content=content,
+                    content_type='image/gif'
+                )
+            )
+            for content in (SMALL_GIF, SMALL_GIF.replace(b'\xFF', b'\xFE'))
+        )
+        generate_thumbnails(removed.image)
+        source = ImageFile(removed.image)
+        self.assertIsNotNone(default.kvstore.get(source))
+        storage = removed.image.storage
+        removed.delete()
+
+        output = StringIO()
+        call_command('gc_media', '--dry-run', '--min-age', '0', stdout=output)
+        self.assertIn('Найдено файлов: 1', output.getvalue())
+        self.assertTrue(storage.exists(source.name))
+
+        call_command('gc_media', '--min-age', '0', stdout=StringIO())
+        self.assertFalse(storage.exists(source.name))
+        self.assertTrue(storage.exists(kept.image.name))
+        self.assertIsNone(default.kvstore.get(source))
+
+    def test_gc_media_spares_recent_files(self):
+        """Свежие файлы без ссылок не удаляются: пост может быть ещё
+        не сохранён."""
+        name = FileSystemStorage().save(
+            'posts/upload.gif', ContentFile(SMALL_GIF)
+        )
+        call_command('gc_media', stdout=StringIO())
+        self.assertTrue(FileSystemStorage().exists(name))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = cls.create_post('green')
+
+    @classmethod
+    def create_post(cls, color):
+        source = BytesIO()
+        Image.new('RGB', (2000, 1000), color).save(source, 'JPEG')
+        post = Post.objects.create(
+            author=cls.user,
+            text='Пост с большой картинкой',
+            image=SimpleUploadedFile(
+                name='big.jpg',
+                content=source.getvalue(),
+                content_type='image/jpeg'
+            )
+        )
+        generate_variants(post.pk)
+        post.refresh_from_db()
+        return post
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_variants_cover_widths_and_formats(self):
+        """Для картинки созданы все ширины во всех форматах с пропорциями
+        карточки."""
+        variants = json.loads(self.post.image_variants)
+        self.assertEqual(
+            {(variant['format'], variant['width']) for variant in variants},
+            {
+                (image_format, width)
+                for image_format in VARIANT_FORMATS
+                for width in VARIANT_WIDTHS
+            }
+        )
+        storage = self.post.image.storage
+        for variant in variants:
+            with self.subTest(variant=variant['name']):
+                with storage.open(variant['name']) as file:
+                    with Image.open(file) as image:
+                        self.assertEqual(
+                            image.size, (variant['width'], variant['height'])
+                        )
+
+    def test_post_detail_renders_srcset_without_thumbnail_engine(self):
+        """Страница поста строит srcset из описания вариантов и не
+        обращается к KV-хранилищу sorl."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, 'srcset=', count=len(VARIANT_FORMATS))
+        self.assertContains(response, '/media/variants/')
+        self.assertFalse(any(
+            'thumbnail_kvstore' in query['sql'] for query in queries
+        ))
+
+    def test_gc_media_removes_variants_of_deleted_post(self):
+        """gc_media удаляет варианты картинки удалённого поста."""
+        post = self.create_post('blue')
+        names = [
+            variant['name'] for variant in json.loads(post.image_variants)
+        ]
+        post.delete()
+        call_command('gc_media', '--min-age', '0', stdout=StringIO())
+        for name in names:
+            self.assertFalse(FileSystemStorage().exists(name))
+        for variant in json.loads(self.post.image_variants):
+            self.assertTrue(FileSystemStorage().exists(variant['name']))
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Comment, Post
+from ..utils import (PAGINATION_CURSOR, POSTS_PER_PAGE, CursorPage,
+                     CursorPaginator, get_page_context)
+
+User = get_user_model()
+POSTS_COUNT = 23
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create([
+            Post(author=cls.user, text=f'Тестовый пост {i}')
+            for i in range(POSTS_COUNT)
+        ])
+        cls.factory = RequestFactory()
+
+    def get_page(self, cursor=None):
+        params = {'page': cursor} if cursor else {}
+        request = self.factory.get('/', params)
+        return get_page_context(
+            Post.objects.all(), request, mode=PAGINATION_CURSOR
+        )
+
+    def test_cursor_pages_walk_forward_and_back(self):
+        """Курсоры ведут по всем постам вперёд и обратно без повторов."""
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+        pages = [self.get_page()]
+        while pages[-1].has_next():
+            pages.append(self.get_page(pages[-1].next_page_number()))
+        seen = [post.id for page in pages for post in page]
+        self.assertEqual(seen, expected)
+        self.assertIsInstance(pages[0], CursorPage)
+        self.assertFalse(pages[0].has_previous())
+        self.assertEqual(len(pages[0]), POSTS_PER_PAGE)
+        self.assertEqual(len(pages[-1]), POSTS_COUNT % POSTS_PER_PAGE)
+        previous = self.get_page(pages[1].previous_page_number())
+        self.assertEqual(
+            [post.id for post in previous], [post.id for post in pages[0]]
+        )
+        self.assertFalse(previous.has_previous())
+        self.assertTrue(previous.has_next())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный токен открывает первую страницу."""
+        for cursor in (
+            'garbage', 'eyJ2IjoxfQ', 'W10', 'eyJ2IjpbNSwxXSwiciI6ZmFsc2V9'
+        ):
+            with self.subTest(cursor=cursor):
+                page = self.get_page(cursor)
+                self.assertFalse(page.has_previous())
+                self.assertEqual(len(page), POSTS_PER_PAGE)
+
+    def test_page_queryset_is_the_query_of_get_page(self):
+        """page_queryset отдаёт запрос, которым get_page читает страницу."""
+        paginator = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        first = paginator.get_page(None)
+        cursor = first.next_page_number()
+        self.assertEqual(
+            list(paginator.page_queryset(cursor))[:POSTS_PER_PAGE],
+            list(paginator.get_page(cursor))
+        )
+
+
+class ListingPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create([
+            Post(author=cls.user, text=f'Тестовый пост {i}')
+            for i in range(POSTS_COUNT)
+        ])
+        cls.post = Post.objects.order_by('id').first()
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Коммент'
+        )
+        cls.factory = RequestFactory()
+
+    def test_count_skips_listing_join_and_subquery(self):
+        """COUNT(*) пагинатора не тянет JOIN и подзапрос for_listing(),
+        даже если queryset перед этим отфильтрован и пересортирован."""
+        queryset = Post.objects.filter(author=self.user).order_by('id')
+        with CaptureQueriesContext(connection) as queries:
+            page = get_page_context(queryset, self.factory.get('/'))
+            rows = list(page)
+        self.assertEqual(page.paginator.count, POSTS_COUNT)
+        count, = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT COUNT(*)')
+        ]
+        self.assertNotIn('JOIN', count)
+        self.assertNotIn('posts_comment', count)
+        self.assertEqual(len(rows), POSTS_PER_PAGE)
+        self.assertEqual(rows[0], self.post)
+        self.assertEqual(rows[0].comment_count, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(rows[0].author.username, 'auth')
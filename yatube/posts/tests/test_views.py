@@ -1,16 +1,28 @@
 import shutil
 import tempfile
+import time
+from http import HTTPStatus
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 from django import forms
+from PIL import ExifTags, Image
 
+from ..caching import bump_generation, get_generations
+from ..counters import get_comment_count
 from ..forms import PostForm
-from ..models import Group, Follow, Post
+from ..images import IMAGE_MAX_SIDE, ingest_image
+from ..models import Comment, Group, Follow, Post
+from ..utils import COMMENTS_PER_PAGE
+from .utils import run_on_commit_callbacks
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 User = get_user_model()
@@ -94,6 +106,15 @@ class PostViewsTests(TestCase):
             post_create: self.url_post_create_authorized_client_author
         }
 
+    post_image_content = (
+        b'\x47\x49\x46\x38\x39\x61\x02\x00'
+        b'\x01\x00\x80\x00\x00\x00\x00\x00'
+        b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+        b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+        b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+        b'\x0A\x00\x3B'
+    )
+
     def compare_posts(self, post_obj_from_db, post_obj_from_context):
         """Функция сравнивания содержимого полей двух постов."""
         compare_params = ('author', 'text', 'group', 'image')
@@ -134,6 +155,75 @@ class PostViewsTests(TestCase):
                 response = self.authorized_client_author.get(url)
                 self.assertContains(response, '<img')
 
+    def test_listing_defers_thumbnails_to_lazy_endpoint(self):
+        """Лента не ищет миниатюры: карточки лениво грузят их через
+        редирект, который отдаёт адрес миниатюры."""
+        posts = [
+            Post.objects.create(
+                author=self.user,
+                text='Пост с картинкой',
+                image=SimpleUploadedFile(
+                    name=f'small{i}.gif',
+                    content=self.post_image_content,
+                    content_type='image/gif'
+                )
+            )
+            for i in range(3)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(self.url_post_index)
+        self.assertFalse(any(
+            'thumbnail_kvstore' in query['sql'] for query in queries
+        ))
+        self.assertContains(response, 'loading="lazy"', count=3)
+        url = reverse('posts:post_thumbnail', args=(posts[0].pk,))
+        self.assertContains(response, f'src="{url}"')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertTrue(response['Location'].startswith(settings.MEDIA_URL))
+        self.assertEqual(
+            self.guest_client.get(
+                reverse('posts:post_thumbnail', args=(self.post.pk,))
+            ).status_code,
+            HTTPStatus.NOT_FOUND
+        )
+
+    def test_ingest_image_bounds_size_and_strips_exif(self):
+        """Приём картинки поворачивает её по EXIF, уменьшает, очищает и
+        сохраняет заглушку с основным цветом."""
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+        exif[ExifTags.Base.Make] = 'Phone'
+        source = BytesIO()
+        Image.new('RGB', (4000, 3000), 'red').save(
+            source, 'JPEG', exif=exif
+        )
+        post = Post.objects.create(
+            author=self.user,
+            text='Фото с телефона',
+            image=SimpleUploadedFile(
+                name='phone.jpg',
+                content=source.getvalue(),
+                content_type='image/jpeg'
+            )
+        )
+        original = post.image.name
+        self.assertTrue(ingest_image(post.pk))
+        post.refresh_from_db()
+        self.assertEqual(
+            (post.image_width, post.image_height),
+            (IMAGE_MAX_SIDE * 3 // 4, IMAGE_MAX_SIDE)
+        )
+        self.assertFalse(post.image.storage.exists(original))
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (post.image_width,
+                                          post.image_height))
+            self.assertEqual(len(image.getexif()), 0)
+        self.assertTrue(post.image_placeholder.startswith('data:image/'))
+        red, green, blue = bytes.fromhex(post.image_color[1:])
+        self.assertGreater(red, 240)
+        self.assertLess(max(green, blue), 16)
+
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
         self.templates_pages_names_guest.update(
@@ -223,16 +313,71 @@ class PostViewsTests(TestCase):
                         len(response.context['page_obj']), count
                     )
 
-    def test_cache_timeout(self):
-        """Проверяем, что кэш страницы index работает."""
+    def test_listing_query_count_does_not_depend_on_page_size(self):
+        """Число запросов страницы ленты не растёт с числом постов."""
+        self.authorized_client_follower.get(self.url_post_profile_follow)
+        listing_urls = (
+            self.url_post_index,
+            self.url_post_group_list,
+            self.url_post_profile,
+            self.url_post_follow_index,
+        )
+        query_counts = {}
+        for posts_on_page in (1, POSTS_COUNT):
+            Post.objects.exclude(pk=self.post.pk).delete()
+            for i in range(1, posts_on_page):
+                post = Post.objects.create(
+                    author=self.user, text='Тестовый пост', group=self.group
+                )
+                Comment.objects.create(
+                    post=post, author=self.user_follower, text='Коммент'
+                )
+            for url in listing_urls:
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.authorized_client_follower.get(url)
+                query_counts.setdefault(url, set()).add(len(queries))
+        for url, counts in query_counts.items():
+            with self.subTest(url=url):
+                self.assertEqual(len(counts), 1)
+
+    def test_index_cache_invalidation(self):
+        """Проверяем, что кэш страницы index сбрасывается сигналами."""
         response = self.authorized_client_author.get(self.url_post_index)
-        Post.objects.filter(pk=self.post.pk).delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигнала')
         new_response = self.authorized_client_author.get(self.url_post_index)
         self.assertEqual(response.content, new_response.content)
-        cache.clear()
+        Post.objects.filter(pk=self.post.pk).delete()
+        run_on_commit_callbacks()
         check_response = self.authorized_client_author.get(self.url_post_index)
         self.assertNotEqual(response.content, check_response.content)
 
+    def test_group_rename_resets_listing_links(self):
+        """Новый slug группы сразу виден в ссылках главной и профиля."""
+        urls = (self.url_post_index, self.url_post_profile)
+        for url in urls:
+            self.authorized_client_author.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed_slug'
+        group.save()
+        run_on_commit_callbacks()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client_author.get(url)
+                self.assertContains(response, '/group/renamed_slug/')
+
+    def test_generation_is_bumped_after_commit(self):
+        """Поколение страниц поста меняется только после фиксации
+        транзакции, в которой пост сохранён."""
+        scopes = ['posts', f'post:{self.post.pk}']
+        generations = get_generations(scopes)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Правка'
+        post.save()
+        self.assertEqual(get_generations(scopes), generations)
+        run_on_commit_callbacks()
+        self.assertNotEqual(get_generations(scopes), generations)
+
     def test_authorized_user_can_subscribe_unsubscribe(self):
         """Проверяем, что авторизованный пользователь
         может подписываться на других пользователей и отписываться от них."""
@@ -263,3 +408,144 @@ class PostViewsTests(TestCase):
         response = self.authorized_client.get(self.url_post_follow_index)
         post_object = response.context['page_obj']
         self.assertEqual(len(post_object), 0)
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Вирусный пост')
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(COMMENTS_PER_PAGE + 5)
+        ])
+        cls.url_post_detail = reverse(
+            'posts:post_detail', args=(cls.post.pk,)
+        )
+        cls.url_post_comments = reverse(
+            'posts:post_comments', args=(cls.post.pk,)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_comments_and_total(self):
+        """Пост показывает первую порцию комментариев и их общее число."""
+        response = self.client.get(self.url_post_detail)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertEqual(
+            response.context['comment_count'], COMMENTS_PER_PAGE + 5
+        )
+        self.assertContains(response, 'data-fragment=')
+
+    def test_fragment_returns_next_batch(self):
+        """Фрагмент по курсору отдаёт оставшиеся комментарии."""
+        first = self.client.get(self.url_post_detail).context['comments']
+        response = self.client.get(
+            self.url_post_comments, {'cursor': first.next_page_number()}
+        )
+        rest = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in rest],
+            [
+                f'Комментарий {i}'
+                for i in range(COMMENTS_PER_PAGE, COMMENTS_PER_PAGE + 5)
+            ]
+        )
+        self.assertFalse(rest.has_next())
+        self.assertNotContains(response, '<html')
+
+    def test_broken_comment_cursor_opens_first_batch(self):
+        """Курсор с числом вместо даты открывает первую порцию, а не 500."""
+        cursor = 'eyJ2IjpbNSwxXSwiciI6ZmFsc2V9'
+        response = self.client.get(self.url_post_detail, {'comments': cursor})
+        self.assertEqual(response.context['comments'][0].text, 'Комментарий 0')
+        response = self.client.get(self.url_post_comments, {'cursor': cursor})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_comment_count_cache_is_reset_by_new_comment(self):
+        """Новый комментарий сбрасывает закэшированное число."""
+        self.assertEqual(
+            get_comment_count(self.post.pk), COMMENTS_PER_PAGE + 5
+        )
+        Comment.objects.create(post=self.post, author=self.user, text='Ещё')
+        self.assertEqual(
+            get_comment_count(self.post.pk), COMMENTS_PER_PAGE + 5
+        )
+        run_on_commit_callbacks()
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                get_comment_count(self.post.pk), COMMENTS_PER_PAGE + 6
+            )
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='Test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group
+        )
+        cls.url_post_detail = reverse(
+            'posts:post_detail', args=(cls.post.pk,)
+        )
+        # Адрес и число запросов валидаторов при ответе 304.
+        cls.urls = (
+            (cls.url_post_detail, 2),
+            (reverse('posts:group_list', args=(cls.group.slug,)), 1),
+            (reverse('posts:profile', args=(cls.user.username,)), 1),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_pages_answer_not_modified(self):
+        """Повтор с ETag получает 304 без рендера и запросов списка."""
+        for url, queries in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertFalse(response.has_header('Last-Modified'))
+                with self.assertNumQueries(queries):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+    def test_new_comment_and_login_change_validators(self):
+        """Новый комментарий и вход пользователя меняют ETag."""
+        url = self.url_post_detail
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_if_modified_since_alone_never_answers_not_modified(self):
+        """Без If-None-Match правка поста и вход пользователя не дают 304
+        по одному If-Modified-Since."""
+        since = http_date(time.time() + 3600)
+        url = self.url_post_detail
+        self.client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Правка')
+        bump_generation(f'post:{self.post.pk}')
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Правка')
+        profile = reverse('posts:profile', args=(self.user.username,))
+        self.client.get(profile)
+        self.client.force_login(self.user)
+        response = self.client.get(profile, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
@@ -0,0 +1,14 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def run_on_commit_callbacks(using=DEFAULT_DB_ALIAS):
+    """Выполняет обработчики transaction.on_commit, отложенные тестом.
+
+    TestCase не фиксирует свою транзакцию, а captureOnCommitCallbacks
+    появился только в Django 3.2.
+    """
+    connection = connections[using]
+    while connection.run_on_commit:
+        callbacks, connection.run_on_commit = connection.run_on_commit, []
+        for _, callback in callbacks:
+            callback()
@@ -0,0 +1,77 @@
+"""Фоновая генерация миниатюр sorl-thumbnail для картинок постов.
+
+Без неё миниатюра создаётся при первом рендере поста и задерживает
+этот запрос. Генерацию ставит posts.images после приёма картинки.
+Геометрия THUMBNAIL_SIZES должна совпадать с тегами {% thumbnail %}
+в шаблонах.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from .variants import picture_for
+
+CARD_THUMBNAIL = ('960x339', {'crop': 'center', 'upscale': True})
+THUMBNAIL_SIZES = (CARD_THUMBNAIL,)
+THUMBNAIL_WORKERS: int = 2
+# Картинка поста может смениться при правке, поэтому редирект на
+# миниатюру кэшируется недолго.
+THUMBNAIL_REDIRECT_MAX_AGE: int = 300
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(
+                    settings, 'THUMBNAIL_WORKERS', THUMBNAIL_WORKERS
+                ),
+                thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+
+def generate_thumbnails(image):
+    """Создаёт все миниатюры картинки; image — файл или имя в хранилище."""
+    for geometry, options in THUMBNAIL_SIZES:
+        get_thumbnail(image, geometry, **options)
+
+
+def thumbnail_url(image, size=CARD_THUMBNAIL):
+    """Адрес миниатюры; создаёт её, если её ещё нет."""
+    geometry, options = size
+    return get_thumbnail(image, geometry, **options).url
+
+
+def attach_thumbnails(posts, size=CARD_THUMBNAIL, lazy=False):
+    """Проставляет post.picture из готовых вариантов, а постам без них —
+    post.thumbnail через get_thumbnail.
+
+    С lazy миниатюры не ищутся вовсе: карточка получает
+    post.lazy_thumbnail с адресом posts:post_thumbnail, и браузер
+    запросит его, только когда картинка приблизится к экрану. Так
+    рендерятся все ленты; сразу миниатюра нужна только странице поста.
+    """
+    geometry, options = size
+    width, height = map(int, geometry.split('x'))
+    for post in posts:
+        post.thumbnail = post.lazy_thumbnail = None
+        post.picture = picture_for(post)
+        if not post.image or post.picture is not None:
+            continue
+        if lazy:
+            post.lazy_thumbnail = {
+                'url': reverse('posts:post_thumbnail', args=(post.pk,)),
+                'width': width,
+                'height': height,
+            }
+        else:
+            post.thumbnail = get_thumbnail(post.image, geometry, **options)
+    return posts
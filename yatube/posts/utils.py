@@ -1,10 +1,215 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
 
 POSTS_PER_PAGE: int = 10
+PAGINATION_OFFSET = 'offset'
+PAGINATION_CURSOR = 'cursor'
+CURSOR_ORDERING = ('-pub_date', '-id')
+COMMENTS_PER_PAGE: int = 20
+COMMENT_ORDERING = ('created', 'id')
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Сохраняет микросекунды, которые DjangoJSONEncoder обрезает."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values, reverse=False):
+    """Упаковывает значения ключа сортировки в непрозрачный токен."""
+    payload = json.dumps(
+        {'v': list(values), 'r': reverse},
+        cls=CursorEncoder,
+        separators=(',', ':')
+    )
+    token = base64.urlsafe_b64encode(payload.encode())
+    return token.decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для испорченного токена возвращает None."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, reverse = payload['v'], bool(payload['r'])
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        return None
+    if not isinstance(values, list):
+        return None
+    return values, reverse
+
+
+class CursorPage:
+    """Страница keyset-пагинации с интерфейсом django.core.paginator.Page.
+
+    Вместо номеров страниц next_page_number/previous_page_number отдают
+    токены курсора, поэтому шаблоны строят ссылки так же, как для Page.
+    """
+
+    number = None
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of %s objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.next_cursor
 
+    def previous_page_number(self):
+        return self.previous_cursor
 
-def get_page_context(queryset, request):
-    paginator = Paginator(queryset, POSTS_PER_PAGE)
+
+class CursorPaginator:
+    """Keyset-пагинатор: без COUNT(*) и OFFSET, по ключу (pub_date, id).
+
+    Ключ может включать числовые аннотации, например релевантность.
+    """
+
+    def __init__(self, queryset, per_page, ordering=CURSOR_ORDERING):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+
+    def _fields(self, reverse):
+        for field in self.ordering:
+            descending = field.startswith('-')
+            yield field.lstrip('-'), descending != reverse
+
+    def _keyset_filter(self, values, reverse):
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self._fields(reverse), values):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _parse(self, values):
+        if len(values) != len(self.ordering):
+            raise ValidationError('Неверная длина курсора.')
+        return [
+            self._to_python(name, value)
+            for (name, _), value in zip(self._fields(False), values)
+        ]
+
+    def _to_python(self, name, value):
+        if name in self.queryset.query.annotations:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValidationError('Неверное значение курсора.')
+            return value
+        return self.queryset.model._meta.get_field(name).to_python(value)
+
+    def _key(self, obj):
+        return [getattr(obj, name) for name, _ in self._fields(False)]
+
+    def _decode(self, cursor):
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            return None
+        try:
+            return self._parse(decoded[0]), decoded[1]
+        except (ValidationError, FieldDoesNotExist, TypeError, ValueError):
+            return None
+
+    def _page_queryset(self, decoded):
+        queryset = self.queryset.order_by(*self.ordering)
+        if decoded is not None:
+            values, reverse = decoded
+            queryset = queryset.filter(self._keyset_filter(values, reverse))
+            if reverse:
+                queryset = queryset.reverse()
+        return queryset[:self.per_page + 1]
+
+    def page_queryset(self, cursor):
+        """Запрос, которым get_page читает страницу после курсора."""
+        return self._page_queryset(self._decode(cursor))
+
+    def get_page(self, cursor):
+        decoded = self._decode(cursor)
+        reverse = decoded is not None and decoded[1]
+        rows = list(self._page_queryset(decoded))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, decoded is not None
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(self._key(rows[-1]))
+        if rows and has_previous:
+            previous_cursor = encode_cursor(self._key(rows[0]), reverse=True)
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+class ListingPaginator(Paginator):
+    """Считает и режет голый queryset постов, а JOIN и подзапрос
+    for_listing() достаются только строкам страницы."""
+
+    def _get_page(self, object_list, number, paginator):
+        return super()._get_page(
+            object_list.for_listing(), number, paginator
+        )
+
+
+def get_page_context(queryset, request, mode=PAGINATION_OFFSET,
+                     ordering=CURSOR_ORDERING):
+    """Страница постов; queryset передаётся без for_listing()."""
     page_number = request.GET.get('page')
+    if mode == PAGINATION_CURSOR:
+        return CursorPaginator(
+            queryset.for_listing(), POSTS_PER_PAGE, ordering
+        ).get_page(page_number)
+    paginator = ListingPaginator(queryset, POSTS_PER_PAGE)
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def get_comments_paginator(post):
+    return CursorPaginator(
+        post.comments.select_related('author'),
+        COMMENTS_PER_PAGE,
+        COMMENT_ORDERING
+    )
+
+
+def get_comments_page(post, cursor):
+    """Порция комментариев поста от старых к новым после курсора."""
+    return get_comments_paginator(post).get_page(cursor)
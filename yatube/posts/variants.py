@@ -0,0 +1,130 @@
+"""Адаптивные варианты картинок постов в нескольких ширинах и форматах.
+
+Варианты считаются в пуле процессов: масштабирование в Pillow съедает
+процессор, и в потоках веб-процесса оно мешало бы запросам. Файлы
+кладутся по хэшу исходника — variants/ab/cd/<хэш>/<ширина>w.<формат>,
+а их описание сохраняется в Post.image_variants. Шаблоны строят
+srcset из этого описания, не обращаясь ни к хранилищу, ни к sorl.
+"""
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import features
+
+from .caching import bump_generation
+from .image_ops import render_variants
+from .models import Post
+from .storage import addressed_name, name_digest
+
+VARIANT_WIDTHS = (320, 640, 960, 1440)
+VARIANT_FORMATS = (
+    ('WEBP', 'JPEG') if features.check('webp') else ('JPEG',)
+)
+VARIANT_ASPECT = (960, 339)
+VARIANT_SIZES = '(min-width: 768px) 75vw, 100vw'
+VARIANT_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+VARIANT_WORKERS: int = 2
+VARIANTS_DIR = 'variants'
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: форк процесса с потоками и открытыми соединениями
+            # к базе небезопасен.
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(
+                    settings, 'VARIANT_WORKERS', VARIANT_WORKERS
+                ),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def variants_directory(name):
+    """Каталог вариантов картинки; None, если имя не адресовано."""
+    digest = name_digest(name)
+    if digest is None:
+        return None
+    return addressed_name(f'{VARIANTS_DIR}/', digest)
+
+
+def generate_variants(post_id):
+    """Создаёт варианты картинки поста; True, если описание сохранено."""
+    name = Post.objects.filter(pk=post_id).values_list(
+        'image', flat=True
+    ).first()
+    directory = variants_directory(name) if name else None
+    if directory is None:
+        return False
+    with Post._meta.get_field('image').storage.open(name) as source:
+        data = source.read()
+    arguments = (data, VARIANT_WIDTHS, VARIANT_FORMATS, VARIANT_ASPECT)
+    if getattr(settings, 'IMAGE_PROCESSING_INLINE', False):
+        rendered = render_variants(*arguments)
+    else:
+        rendered = get_process_pool().submit(
+            render_variants, *arguments
+        ).result()
+    variants = []
+    for image_format, width, height, content in rendered:
+        variant = f'{directory}/{width}w.{VARIANT_EXTENSIONS[image_format]}'
+        if not default_storage.exists(variant):
+            variant = default_storage.save(variant, ContentFile(content))
+        variants.append({
+            'format': image_format,
+            'width': width,
+            'height': height,
+            'name': variant,
+        })
+    updated = Post.objects.filter(pk=post_id, image=name).update(
+        image_variants=json.dumps(variants)
+    )
+    if updated:
+        bump_generation('posts', f'post:{post_id}')
+    return bool(updated)
+
+
+def _srcset(variants):
+    return ', '.join(
+        f'{default_storage.url(variant["name"])} {variant["width"]}w'
+        for variant in variants
+    )
+
+
+def picture_for(post):
+    """Данные для <picture> из Post.image_variants или None.
+
+    Последний формат VARIANT_FORMATS уходит в <img> как запасной,
+    остальные — в <source>.
+    """
+    if not post.image_variants:
+        return None
+    by_format = {}
+    for variant in json.loads(post.image_variants):
+        by_format.setdefault(variant['format'], []).append(variant)
+    fallback = by_format.pop(VARIANT_FORMATS[-1], None)
+    if not fallback:
+        return None
+    largest = max(fallback, key=lambda variant: variant['width'])
+    return {
+        'sources': [
+            {'type': f'image/{image_format.lower()}',
+             'srcset': _srcset(variants)}
+            for image_format, variants in by_format.items()
+        ],
+        'src': default_storage.url(largest['name']),
+        'srcset': _srcset(fallback),
+        'sizes': VARIANT_SIZES,
+        'width': largest['width'],
+        'height': largest['height'],
+    }
@@ -1,23 +1,54 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.http import (Http404, HttpResponseBadRequest,
+                         StreamingHttpResponse)
+from django.db.models import Max
 from django.shortcuts import render, get_object_or_404, redirect
+from django.views.decorators.cache import cache_control
 
+from core.db import retry_on_locked
+from core.routers import read_from_replica
+
+from . import export, feed, search
+from .caching import cache_page_by_generation, conditional_by_generation
+from .counters import get_comment_count
+from .follow_graph import is_following
 from .forms import CommentForm, PostForm
-from .models import Follow, Post, Group
-from .utils import get_page_context
+from .images import IMAGE_METADATA_FIELDS, schedule_image_processing
+from .models import Comment, Follow, Post, Group
+from .thumbnails import (THUMBNAIL_REDIRECT_MAX_AGE, attach_thumbnails,
+                         thumbnail_url)
+from .utils import (PAGINATION_CURSOR, get_comments_page,
+                    get_page_context)
 
 User = get_user_model()
 
 
+@cache_page_by_generation('posts', 'comments', 'groups')
+@read_from_replica
 def index(request):
     page_obj = get_page_context(Post.objects.all(), request)
+    attach_thumbnails(page_obj, lazy=True)
     context = {'page_obj': page_obj}
     return render(request, 'posts/index.html', context)
 
 
+def group_last_modified(slug):
+    return Post.objects.filter(group__slug=slug).aggregate(
+        last=Max('pub_date')
+    )['last']
+
+
+@conditional_by_generation(
+    'posts', 'comments', 'groups', last_modified=group_last_modified
+)
+@cache_page_by_generation('posts', 'comments', 'groups')
+@read_from_replica
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     page_obj = get_page_context(group.posts.all(), request)
+    attach_thumbnails(page_obj, lazy=True)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -25,13 +56,25 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+def profile_last_modified(username):
+    return Post.objects.filter(author__username=username).aggregate(
+        last=Max('pub_date')
+    )['last']
+
+
+@conditional_by_generation(
+    'posts', 'comments', 'follows', 'groups',
+    last_modified=profile_last_modified
+)
+@cache_page_by_generation('posts', 'comments', 'follows', 'groups')
+@read_from_replica
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    user = request.user
+    author = get_object_or_404(
+        User.objects.select_related('author_profile'), username=username
+    )
     page_obj = get_page_context(author.posts.all(), request)
-    following = Follow.objects.filter(
-        user__username=user, author=author
-    ).count()
+    attach_thumbnails(page_obj, lazy=True)
+    following = is_following(request.user, author.pk)
     context = {
         'author': author,
         'page_obj': page_obj,
@@ -40,18 +83,74 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@cache_page_by_generation('posts', 'comments', 'groups')
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = get_page_context(
+        search.search_posts(query), request,
+        mode=PAGINATION_CURSOR, ordering=search.SEARCH_ORDERING
+    )
+    attach_thumbnails(page_obj, lazy=True)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def post_last_modified(post_id):
+    published = Post.objects.filter(pk=post_id).values_list(
+        'pub_date', flat=True
+    ).first()
+    commented = Comment.objects.filter(post_id=post_id).aggregate(
+        last=Max('created')
+    )['last']
+    return max(filter(None, (published, commented)), default=None)
+
+
+@conditional_by_generation(
+    'posts', 'groups', 'post:{post_id}', last_modified=post_last_modified
+)
+@cache_page_by_generation('posts', 'groups', 'post:{post_id}')
+@read_from_replica
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__author_profile', 'group'),
+        pk=post_id
+    )
+    attach_thumbnails([post])
     form = CommentForm()
-    comments = post.comments.select_related('author')
+    comments = get_comments_page(post, request.GET.get('comments'))
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': comments,
+        'comment_count': get_comment_count(post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@cache_page_by_generation('post:{post_id}')
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': get_comments_page(post, request.GET.get('cursor')),
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
+@cache_control(max_age=THUMBNAIL_REDIRECT_MAX_AGE)
+@read_from_replica
+def post_thumbnail(request, post_id):
+    image = Post.objects.filter(pk=post_id).values_list(
+        'image', flat=True
+    ).first()
+    if not image:
+        raise Http404
+    return redirect(thumbnail_url(image))
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -64,7 +163,8 @@ def post_create(request):
         return render(request, 'posts/post_create.html', {'form': form})
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    retry_on_locked(post.save)()
+    schedule_image_processing(post)
     return redirect('posts:profile', username=post.author.username)
 
 
@@ -79,7 +179,17 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        image_changed = 'image' in form.changed_data
+        update_fields = list(form.fields)
+        if image_changed:
+            post.image_width = post.image_height = None
+            post.image_variants = post.image_placeholder = ''
+            post.image_color = ''
+            update_fields += IMAGE_METADATA_FIELDS
+        post = form.save(commit=False)
+        post.save(update_fields=update_fields)
+        if image_changed:
+            schedule_image_processing(post)
         return redirect('posts:post_detail', post.pk)
     return render(request, 'posts/post_create.html',
                   {'form': form, "is_edit": True})
@@ -93,15 +203,15 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        retry_on_locked(comment.save)()
     return redirect('posts:post_detail', post.pk)
 
 
 @login_required
+@read_from_replica
 def follow_index(request):
-    page_obj = get_page_context(
-        Post.objects.filter(author__following__user=request.user), request
-    )
+    page_obj = get_page_context(feed.get_feed(request.user), request)
+    attach_thumbnails(page_obj, lazy=True)
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
@@ -110,7 +220,9 @@ def follow_index(request):
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        retry_on_locked(Follow.objects.get_or_create)(
+            user=request.user, author=author
+        )
     return redirect('posts:profile', username=username)
 
 
@@ -123,3 +235,33 @@ def profile_unfollow(request, username):
     if profile_follow_new.exists():
         profile_follow_new.delete()
     return redirect('posts:profile', username=username)
+
+
+@staff_member_required
+def export_posts(request):
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in export.EXPORT_FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки.')
+    since_id = request.GET.get('since_id')
+    if since_id is not None and not since_id.isdigit():
+        return HttpResponseBadRequest('since_id должен быть числом.')
+    since = request.GET.get('since')
+    if since is not None:
+        since = export.parse_since(since)
+        if since is None:
+            return HttpResponseBadRequest('Неверная дата в since.')
+    queryset = export.export_queryset(
+        int(since_id) if since_id else None, since
+    )
+    content_type = {
+        'ndjson': 'application/x-ndjson; charset=utf-8',
+        'csv': 'text/csv; charset=utf-8',
+    }[export_format]
+    response = StreamingHttpResponse(
+        export.iter_export(export_format, queryset),
+        content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="posts.{export_format}"'
+    )
+    return response